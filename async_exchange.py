@@ -0,0 +1,115 @@
+import asyncio
+import logging
+
+import aiohttp
+
+from config import API_BASE_URL, REQUEST_TIMEOUT, REQUEST_RETRIES
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class AsyncKrakenFuturesAPI:
+    # asyncio counterpart of exchange.KrakenFuturesAPI for the public market
+    # data endpoints. One pooled keep-alive session is shared by every request;
+    # each request has its own timeout and is retried with exponential backoff.
+
+    def __init__(self, base_url=API_BASE_URL, timeout=REQUEST_TIMEOUT, retries=REQUEST_RETRIES,
+                 backoff=0.25, pool_size=16):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get_json(self, path, params=None, raw=False):
+        # raw=True returns the undecoded body
+        session = self._get_session()
+        url = f"{self.base_url}/{path}"
+        for attempt in range(self.retries + 1):
+            try:
+                async with session.get(url, params=params) as response:
+                    if response.status in RETRY_STATUSES and attempt < self.retries:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history, status=response.status
+                        )
+                    response.raise_for_status()
+                    if raw:
+                        return await response.read()
+                    return await response.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt >= self.retries or (
+                    isinstance(e, aiohttp.ClientResponseError) and e.status not in RETRY_STATUSES
+                ):
+                    raise
+                delay = self.backoff * (2 ** attempt)
+                logging.warning(f"GET {path} failed ({e!r}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def get_tickers(self):
+        try:
+            data = await self._get_json("tickers")
+            return {item["symbol"]: item for item in data.get("tickers", [])}
+        except Exception as e:
+            logging.error(f"Failed to fetch tickers: {e}")
+            return {}
+
+    async def get_tickers_into(self, buffer):
+        # Parses the response body straight into a TickerBuffer
+        try:
+            buffer.load_json(await self._get_json("tickers", raw=True))
+            return buffer
+        except Exception as e:
+            logging.error(f"Failed to fetch tickers: {e}")
+            return {}
+
+    async def get_orderbook(self, symbol):
+        try:
+            data = await self._get_json("orderbook", {"symbol": symbol})
+            return data.get("orderBook", {})
+        except Exception as e:
+            logging.error(f"Failed to fetch orderbook for {symbol}: {e}")
+            return {}
+
+    async def get_funding_rates(self, symbol):
+        try:
+            data = await self._get_json("historicalfundingrates", {"symbol": symbol})
+            return data.get("rates", [])
+        except Exception as e:
+            logging.error(f"Failed to fetch funding rates for {symbol}: {e}")
+            return []
+
+    async def fetch_market(self, orderbook_symbols=(), funding_symbols=()):
+        # Tickers, orderbooks and funding histories requested concurrently, so
+        # the tick costs one round trip instead of one per endpoint
+        orderbook_symbols = list(orderbook_symbols)
+        funding_symbols = list(funding_symbols)
+        results = await asyncio.gather(
+            self.get_tickers(),
+            *(self.get_orderbook(symbol) for symbol in orderbook_symbols),
+            *(self.get_funding_rates(symbol) for symbol in funding_symbols),
+        )
+        books = results[1:1 + len(orderbook_symbols)]
+        rates = results[1 + len(orderbook_symbols):]
+        return {
+            "tickers": results[0],
+            "orderbooks": dict(zip(orderbook_symbols, books)),
+            "funding": dict(zip(funding_symbols, rates)),
+        }
@@ -0,0 +1,184 @@
+import argparse
+import json
+import time
+
+from simulator import Portfolio, configure_logging
+from strategy import SignalEngine
+from ticker_buffer import TickerBuffer
+from features import FeatureStore
+from config import STARTING_CAPITAL, MAX_POSITIONS, SLEEP_DELAY
+
+try:
+    from config import FEATURE_WINDOW
+except ImportError:
+    FEATURE_WINDOW = 20
+
+
+class SimulatedClock:
+    # Stands in for time.time() so a Portfolio sees the recorded time of each tick
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+class BacktestResult:
+    def __init__(self, portfolio, ticks, elapsed, start_time, end_time):
+        self.portfolio = portfolio
+        self.ticks = ticks
+        self.elapsed = elapsed
+        self.start_time = start_time
+        self.end_time = end_time
+
+    @property
+    def ticks_per_sec(self):
+        return self.ticks / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def trades(self):
+        return self.portfolio.stats.count
+
+    @property
+    def total_gain(self):
+        return self.portfolio.stats.total_gain
+
+
+def record_snapshot(path, tickers, timestamp=None):
+    if isinstance(tickers, TickerBuffer):
+        tickers = tickers.as_tickers()
+    with open(path, "a") as f:
+        f.write(json.dumps({"time": time.time() if timestamp is None else timestamp, "tickers": tickers}))
+        f.write("\n")
+
+
+def load_snapshots(path):
+    # Streams (timestamp, tickers) pairs from a JSON-lines file written by record_snapshot
+    last = None
+    with open(path) as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            snapshot = json.loads(line)
+            timestamp = float(snapshot["time"])
+            if last is not None and timestamp < last:
+                raise ValueError(f"{path}:{line_no}: snapshot at {timestamp} is older than previous {last}")
+            last = timestamp
+            yield timestamp, snapshot["tickers"]
+
+
+def open_snapshots(path):
+    # Ticker tapes (*.tape) are memory-mapped; anything else is read as JSON lines
+    if str(path).endswith(".tape"):
+        from tape import TapeReader
+        with TapeReader(path) as reader:
+            yield from reader.snapshots()
+    else:
+        yield from load_snapshots(path)
+
+
+def open_recorder(path):
+    # Returns a callable(tickers) that appends each poll to `path`
+    if str(path).endswith(".tape"):
+        from tape import TapeWriter
+        return TapeWriter(path).append
+    return lambda tickers: record_snapshot(path, tickers)
+
+
+def replay(tickers, ticks, start=0.0, interval=SLEEP_DELAY):
+    # Repeats a single tickers snapshot as a time series
+    for i in range(ticks):
+        yield start + i * interval, tickers
+
+
+def run_backtest(snapshots, threshold=None, portfolio=None, portfolio_cls=Portfolio, limit=MAX_POSITIONS,
+                 min_trend=None, max_volatility=None):
+    # min_trend / max_volatility gate signals on rolling features (see features.py)
+    clock = SimulatedClock()
+    if portfolio is None:
+        portfolio = portfolio_cls(initial_cash=STARTING_CAPITAL, max_open_positions=MAX_POSITIONS, clock=clock)
+    else:
+        portfolio.clock = clock
+    portfolio.dashboard = None
+
+    engine = SignalEngine(override_threshold=threshold)
+    features = FeatureStore(FEATURE_WINDOW) if min_trend is not None or max_volatility is not None else None
+    allow = None
+    ticks = 0
+    start_time = end_time = None
+    started = time.perf_counter()
+    for timestamp, tickers in snapshots:
+        clock.now = timestamp
+        if start_time is None:
+            start_time = timestamp
+            portfolio.session_start = timestamp
+        end_time = timestamp
+        if not tickers:
+            continue
+
+        if features:
+            allow = features.update(tickers).gate(min_trend, max_volatility)
+        signals = engine.update(tickers, limit=limit, allow=allow)
+        for symbol, signal in signals.items():
+            if symbol not in tickers:
+                continue
+            portfolio.execute_trade(
+                symbol=symbol,
+                direction=signal["direction"],
+                data=tickers[symbol],
+                leverage=signal.get("leverage"),
+                scalp=signal.get("scalp", False),
+                simulate=True
+            )
+        portfolio.last_tickers = tickers
+        portfolio.update_positions(tickers)
+        ticks += 1
+
+    return BacktestResult(portfolio, ticks, time.perf_counter() - started, start_time, end_time)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded ticker snapshots through the simulator")
+    parser.add_argument("snapshots", help="ticker tape (*.tape) or JSON-lines file written by record_snapshot")
+    parser.add_argument("--threshold", type=float, default=None, help="override MOMENTUM_THRESHOLD")
+    parser.add_argument("--min-trend", type=float, default=None, help="required window momentum %% in the trade's direction")
+    parser.add_argument("--max-volatility", type=float, default=None, help="skip symbols above this per-tick volatility %%")
+    parser.add_argument("--events", default=None, help="write JSON-lines entry/exit events to this file (off by default)")
+    parser.add_argument("--books", default=None,
+                        help='fill against orderbooks: "synthetic", or a JSON-lines recording from execution.py')
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before an order reaches the book (with --books)")
+    parser.add_argument("--vectorized", action="store_true", help="use the NumPy position engine")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    portfolio_cls = Portfolio
+    if args.vectorized:
+        from position_engine import VectorPortfolio
+        portfolio_cls = VectorPortfolio
+
+    events = execution = None
+    if args.events:
+        from eventlog import EventLog
+        events = EventLog(args.events)
+    if args.books:
+        from execution import open_fill_model
+        execution = open_fill_model(args.books, args.latency)
+    portfolio = None
+    if events or execution:
+        portfolio = portfolio_cls(initial_cash=STARTING_CAPITAL, max_open_positions=MAX_POSITIONS,
+                                  events=events, execution=execution)
+    result = run_backtest(open_snapshots(args.snapshots), threshold=args.threshold, portfolio=portfolio,
+                          portfolio_cls=portfolio_cls, min_trend=args.min_trend, max_volatility=args.max_volatility)
+    if events:
+        events.close()
+    print(f"Ticks: {result.ticks}  Trades: {result.trades}  Open: {len(result.portfolio.positions)}")
+    print(f"Total PnL: ${result.total_gain:.2f}  Final Cash: ${result.portfolio.cash:.2f}")
+    if execution:
+        fills = execution.summary()
+        print(f"Fills: {fills['fills']}  Partial: {fills['partial_fills']}  Unpriced: {fills['unpriced']}  "
+              f"Avg slippage: {fills['avg_slippage_bps']:.2f} bps")
+    print(f"Replayed in {result.elapsed:.2f}s ({result.ticks_per_sec:.1f} ticks/sec)")
+
+
+if __name__ == "__main__":
+    main()
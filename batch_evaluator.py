@@ -0,0 +1,148 @@
+import numpy as np
+
+from backtest import replay
+from config import STARTING_CAPITAL, MAX_POSITIONS, MIN_VOLUME, FUNDING_RATE_SHORT, FUNDING_RATE_LONG
+from position_engine import LONG, SHORT, evaluate_exits, net_pnl
+from simulator import load_settings
+
+# Scores a whole population of momentum thresholds in one pass. The ticker
+# universe is parsed once per tick and every portfolio is a row of a
+# (genes x symbols) state matrix, so the per-symbol filtering done by
+# detect_signals and the exit checks done by Portfolio.update_positions are
+# shared by all genes. Results are identical to evaluate_strategy per gene:
+# trades are opened in signal order and closed in symbol order, so cash and the
+# running gain/capital sums see the same floating point operations.
+
+DEFAULT_LEVERAGE = 20  # Portfolio.default_leverage
+
+
+def _universe(snapshots):
+    symbols = set()
+    for _, tickers in snapshots:
+        symbols.update(tickers)
+    return sorted(symbols)
+
+
+def _parse(tickers, columns):
+    # Mark prices for every listed symbol plus the signal candidates in
+    # detect_signals order: (column, direction, abs(change))
+    prices = np.full(len(columns), np.nan)
+    candidates = []
+    for symbol, data in tickers.items():
+        col = columns[symbol]
+        prices[col] = float(data.get("markPrice", 0))
+        try:
+            change = float(data.get("change24h", 0))
+            volume = float(data.get("volumeQuote", 0))
+            funding = float(data.get("fundingRate", 0))
+        except (TypeError, ValueError):
+            continue
+        if volume < MIN_VOLUME:
+            continue
+        if change > 0 and funding < FUNDING_RATE_LONG:
+            candidates.append((col, LONG, abs(change)))
+        elif change < 0 and funding > FUNDING_RATE_SHORT:
+            candidates.append((col, SHORT, abs(change)))
+    candidates.sort(key=lambda c: -c[2])
+    return prices, candidates[:MAX_POSITIONS]
+
+
+def evaluate_thresholds(thresholds, tickers, ticks=50):
+    snapshots = list(replay(tickers, ticks) if isinstance(tickers, dict) else tickers)
+    settings = load_settings()
+    symbols = _universe(snapshots)
+    columns = {symbol: col for col, symbol in enumerate(symbols)}
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    shape = (len(thresholds), len(symbols))
+    rows = np.arange(len(thresholds))
+
+    fee_rate = settings.get("TRADING_FEE", 0.0006)
+    funding_rate = settings.get("FUNDING_RATE_ESTIMATE", 0.0002)
+    if settings.get("ADAPTIVE_SCALING", True):
+        scalp_cap_pct = settings.get("SCALPING_CAPITAL_PCT", 0.05)
+        swing_cap_pct = settings.get("NORMAL_TRADE_CAPITAL_PCT", 0.1)
+    else:
+        scalp_cap_pct = swing_cap_pct = 0.05
+    swing_sl_pct = settings.get("STOP_LOSS_PCT", 0.005) * (DEFAULT_LEVERAGE / 10)
+    swing_tp_pct = settings.get("TAKE_PROFIT_PCT", 0.018) * (DEFAULT_LEVERAGE / 10)
+    trail_pct = settings.get("TRAIL_STOP_PCT", 0.003)
+
+    cash = np.full(len(thresholds), float(STARTING_CAPITAL))
+    open_count = np.zeros(len(thresholds), dtype=np.int64)
+    total_gain = np.zeros(len(thresholds))
+    total_capital = np.zeros(len(thresholds))
+
+    held = np.zeros(shape, dtype=bool)
+    direction = np.zeros(shape, dtype=np.int8)
+    scalp = np.zeros(shape, dtype=bool)
+    breakeven_set = np.zeros(shape, dtype=bool)
+    trailing_active = np.zeros(shape, dtype=bool)
+    entry_price, size, leverage, hours_held, capital_used, max_price, min_price, \
+        stop_loss_pct, take_profit_pct, trail_offset_pct = (np.ones(shape) for _ in range(10))
+
+    for _, tickers in snapshots:
+        if not tickers:
+            continue
+        prices, candidates = _parse(tickers, columns)
+
+        # Portfolio.execute_trade for each signal, across all genes at once
+        for col, side, strength in candidates:
+            price = prices[col]
+            if not price:
+                continue
+            is_scalp = strength >= thresholds
+            opened = (open_count < MAX_POSITIONS) & ~held[:, col]
+            cap_pct = np.where(is_scalp, scalp_cap_pct, swing_cap_pct)
+            trade_cash = cash * cap_pct
+            cost = trade_cash * (1 + fee_rate)
+            opened &= ~(cash < cost)
+            if not opened.any():
+                continue
+            g = rows[opened]
+            cash[g] -= cost[g]
+            open_count[g] += 1
+            held[g, col] = True
+            direction[g, col] = side
+            scalp[g, col] = is_scalp[g]
+            breakeven_set[g, col] = False
+            trailing_active[g, col] = False
+            entry_price[g, col] = max_price[g, col] = min_price[g, col] = price
+            size[g, col] = trade_cash[g] / price
+            leverage[g, col] = np.where(is_scalp[g], 50, 10)
+            hours_held[g, col] = 0
+            capital_used[g, col] = cost[g]
+            stop_loss_pct[g, col] = np.where(is_scalp[g], 0.005, swing_sl_pct)
+            take_profit_pct[g, col] = np.where(is_scalp[g], 0.018, swing_tp_pct)
+            trail_offset_pct[g, col] = trail_pct
+
+        # Portfolio.update_positions
+        if not held.any():
+            continue
+        price_matrix = np.where(held, prices, np.nan)
+        _, pnl_pct, _, exit_code = evaluate_exits(
+            price_matrix, direction, entry_price, leverage, hours_held, max_price, min_price,
+            stop_loss_pct, take_profit_pct, trail_offset_pct, scalp, breakeven_set, trailing_active,
+        )
+        closed = exit_code != 0
+        if not closed.any():
+            continue
+        net = net_pnl(pnl_pct, entry_price, size, hours_held, capital_used, fee_rate, funding_rate)
+        for col in np.flatnonzero(closed.any(axis=0)):
+            g = closed[:, col]
+            cash[g] += capital_used[g, col] + net[g, col]
+            total_gain[g] += net[g, col]
+            total_capital[g] += capital_used[g, col]
+        held &= ~closed
+        open_count -= closed.sum(axis=1)
+
+    return [
+        gain / capital if capital > 0 else 0
+        for gain, capital in zip(total_gain.tolist(), total_capital.tolist())
+    ]
+
+
+def evaluate_population_batched(population, tickers, ticks=50):
+    fitness = evaluate_thresholds([gene.momentum_threshold for gene in population], tickers, ticks)
+    for gene, value in zip(population, fitness):
+        gene.fitness = value
+    return fitness
@@ -0,0 +1,283 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from backtest import record_snapshot
+from simulator import Portfolio
+from strategy import detect_signals, detect_signals_buffer, SignalEngine
+from ticker_buffer import TickerBuffer
+from features import FeatureStore
+from config import MIN_VOLUME
+
+# Reproducible benchmarks for the simulator, strategy and evolution hot paths
+# on synthetic tickers. Every case reports ops/sec (median of `repeat` timed
+# runs) plus the peak and retained memory (and retained block count) of one
+# extra run under tracemalloc, which is kept out of the timings. Results can
+# be saved as a baseline and later runs compared against it:
+#
+#   python benchmark.py --symbols 300,1000,3000 --save
+#   python benchmark.py --symbols 300,1000,3000 --compare
+
+BASELINE_PATH = "benchmark_baseline.json"
+
+
+def synthetic_tickers(symbols, rng):
+    # One poll of `symbols` contracts; about a third pass the volume filter
+    # and the 24h change spans both signal directions
+    tickers = {}
+    for i in range(symbols):
+        symbol = f"PF_SYN{i:05d}USD"
+        tickers[symbol] = {
+            "symbol": symbol,
+            "markPrice": rng.uniform(0.01, 50000.0),
+            "change24h": rng.uniform(-20.0, 20.0),
+            "volumeQuote": rng.uniform(0.0, MIN_VOLUME * 3),
+            "fundingRate": rng.uniform(-0.002, 0.002),
+        }
+    return tickers
+
+
+def synthetic_snapshots(symbols, ticks, seed=0, interval=3.0):
+    # Random-walk series of polls over a fixed universe
+    rng = random.Random(seed)
+    tickers = synthetic_tickers(symbols, rng)
+    snapshots = []
+    for tick in range(ticks):
+        current = {}
+        for symbol, data in tickers.items():
+            data = dict(data)
+            data["markPrice"] *= 1 + rng.gauss(0, 0.004)
+            data["change24h"] += rng.gauss(0, 0.3)
+            current[symbol] = data
+        tickers = current
+        snapshots.append((tick * interval, tickers))
+    return snapshots
+
+
+def open_portfolio(tickers, positions):
+    # Portfolio holding `positions` open trades on the first symbols
+    portfolio = Portfolio(initial_cash=1e12, max_open_positions=positions)
+    for i, symbol in enumerate(list(tickers)[:positions]):
+        portfolio.execute_trade(symbol, "long" if i % 2 else "short", tickers[symbol], leverage=10, scalp=i % 3 == 0)
+    return portfolio
+
+
+def _quiet_update(portfolio, tickers):
+    # update_positions without exits: positions far from any level stay open
+    for pos in portfolio.positions.values():
+        pos.stop_loss_pct = 10.0
+        pos.take_profit_pct = 10.0
+        pos.scalp = False
+    return lambda: portfolio.update_positions(tickers)
+
+
+def cases(symbols, positions, ticks, seed, cleanup):
+    # name -> (setup() returning the callable to time, ops per call); files
+    # a setup creates are registered on the `cleanup` ExitStack
+    def detect():
+        tickers = synthetic_tickers(symbols, random.Random(seed))
+        return lambda: detect_signals(tickers, limit=20)
+
+    def parse():
+        tickers = synthetic_tickers(symbols, random.Random(seed))
+        payload = json.dumps({"result": "success", "tickers": list(tickers.values())}).encode()
+        buffer = TickerBuffer()
+        return lambda: buffer.load_json(payload)
+
+    def detect_buffer():
+        buffer = TickerBuffer().load_tickers(synthetic_tickers(symbols, random.Random(seed)))
+        return lambda: detect_signals_buffer(buffer, limit=20)
+
+    def feature_update():
+        snapshots = synthetic_snapshots(symbols, 2, seed)
+        buffers = [TickerBuffer().load_tickers(tickers) for _, tickers in snapshots]
+        store = FeatureStore()
+        store.update(buffers[0])
+        polls = iter(buffers * (1 << 21))
+        return lambda: store.update(next(polls))
+
+    def engine_update():
+        snapshots = synthetic_snapshots(symbols, 2, seed)
+        engine = SignalEngine()
+        engine.update(snapshots[0][1], limit=20)
+        return lambda: engine.update(snapshots[1][1], limit=20)
+
+    def execute():
+        tickers = synthetic_tickers(symbols, random.Random(seed))
+        chosen = list(tickers)[:positions]
+
+        def run():
+            portfolio = Portfolio(initial_cash=1e12, max_open_positions=positions)
+            for symbol in chosen:
+                portfolio.execute_trade(symbol, "long", tickers[symbol], leverage=10)
+        return run
+
+    def fill():
+        from execution import FillModel, RecordedBooks
+        rng = random.Random(seed)
+        tickers = synthetic_tickers(symbols, rng)
+        chosen = list(tickers)[:positions]
+        marks = [float(tickers[symbol]["markPrice"]) for symbol in chosen]
+        books = RecordedBooks()
+        for symbol, mark in zip(chosen, marks):
+            for t in range(ticks):
+                books.add(t * 3.0, symbol, {
+                    "bids": [[mark * (1 - 1e-4 * (i + 1)), rng.uniform(0.5, 5.0) * (i + 1)] for i in range(25)],
+                    "asks": [[mark * (1 + 1e-4 * (i + 1)), rng.uniform(0.5, 5.0) * (i + 1)] for i in range(25)],
+                })
+        model = FillModel(books, latency=1.0)
+        orders = [(symbol, "buy" if i % 2 else "sell", 40.0, mark, (i % ticks) * 3.0)
+                  for i, (symbol, mark) in enumerate(zip(chosen, marks))]
+
+        def run():
+            for symbol, side, size, mark, now in orders:
+                model.fill(symbol, side, size, mark, now)
+        return run
+
+    def update():
+        tickers = synthetic_tickers(symbols, random.Random(seed))
+        return _quiet_update(open_portfolio(tickers, positions), tickers)
+
+    def strategy():
+        from genetic_evolution import StrategyGene, evaluate_strategy
+        snapshots = synthetic_snapshots(symbols, ticks, seed)
+        return lambda: evaluate_strategy(StrategyGene(7.0), snapshots)
+
+    def evolve_run():
+        from genetic_evolution import evolve
+        directory = cleanup.enter_context(tempfile.TemporaryDirectory(prefix="bench-"))
+        path = os.path.join(directory, "tickers.jsonl")
+        out = os.path.join(directory, "evolution_results.csv")
+        for timestamp, tickers in synthetic_snapshots(symbols, ticks, seed):
+            record_snapshot(path, tickers, timestamp)
+
+        def run():
+            # evolve prints per generation
+            with contextlib.redirect_stdout(io.StringIO()):
+                evolve(population_size=6, generations=2, snapshots_path=path, seed=seed, out=out)
+        return run
+
+    return {
+        "detect_signals": (detect, 1),
+        "TickerBuffer.load_json": (parse, 1),
+        "detect_signals_buffer": (detect_buffer, 1),
+        "SignalEngine.update": (engine_update, 1),
+        "FeatureStore.update": (feature_update, 1),
+        "Portfolio.execute_trade": (execute, positions),
+        "FillModel.fill": (fill, positions),
+        "Portfolio.update_positions": (update, 1),
+        "evaluate_strategy": (strategy, 1),
+        "evolve": (evolve_run, 1),
+    }
+
+
+def measure(fn, ops, repeat, min_time=0.2):
+    # Calls per timed run are scaled so each run lasts at least min_time
+    fn()
+    calls = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or calls >= 1 << 20:
+            break
+        calls *= 2
+    timings = [elapsed]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        timings.append(time.perf_counter() - started)
+    per_call = statistics.median(timings) / calls
+
+    tracemalloc.start()
+    fn()
+    retained, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+
+    return {
+        "ops_per_sec": ops / per_call,
+        "sec_per_call": per_call,
+        "peak_kb": peak / 1024,
+        "retained_kb": retained / 1024,
+        "retained_blocks": blocks,
+    }
+
+
+def run(symbol_counts, positions, ticks, repeat, seed, only=None):
+    results = {}
+    for symbols in symbol_counts:
+        with contextlib.ExitStack() as cleanup:
+            for name, (setup, ops) in cases(symbols, positions, ticks, seed, cleanup).items():
+                if only and name not in only:
+                    continue
+                key = f"{name}[{symbols}]"
+                results[key] = measure(setup(), ops, repeat)
+                r = results[key]
+                print(f"{key:<36} {r['ops_per_sec']:>14,.1f} ops/s  {r['peak_kb']:>10,.1f} KiB peak  {r['retained_blocks']:>8} blocks kept")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    # Cases whose throughput fell more than `tolerance` below the baseline
+    regressions = []
+    for key, r in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        change = r["ops_per_sec"] / base["ops_per_sec"] - 1
+        print(f"{key:<36} {change:+7.1%} vs baseline")
+        if change < -tolerance:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark simulator, strategy and evolution hot paths")
+    parser.add_argument("--symbols", default="300,1000,3000", help="comma-separated universe sizes")
+    parser.add_argument("--positions", type=int, default=20, help="open positions for the Portfolio cases")
+    parser.add_argument("--ticks", type=int, default=50, help="polls per evaluate_strategy / evolve dataset")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case (median is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", default=None, help="comma-separated case names to run")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="exit 1 if any case is slower than the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before --compare fails")
+    args = parser.parse_args(argv)
+
+    symbol_counts = [int(n) for n in args.symbols.split(",")]
+    only = set(args.only.split(",")) if args.only else None
+    results = run(symbol_counts, args.positions, args.ticks, args.repeat, args.seed, only)
+
+    if args.compare:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions: " + ", ".join(regressions))
+            sys.exit(1)
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "results": results,
+            }, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
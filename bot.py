@@ -1,62 +1,207 @@
+import argparse
+import importlib
+import logging
+import sys
+import time
 
-from simulator import Portfolio
-from strategy import detect_signals
-from exchange import KrakenFuturesAPI
 from config import STARTING_CAPITAL, SLEEP_DELAY, MAX_POSITIONS, REAL_TRADING, DRY_RUN
 from __version__ import __version__
-import time
-import logging
 
 try:
     from config import DEBUG_NO_UI
 except ImportError:
     DEBUG_NO_UI = False
 
-print(f"GPT Trading Bot v{__version__}")
-api = KrakenFuturesAPI()
-portfolio = Portfolio(initial_cash=STARTING_CAPITAL, max_open_positions=MAX_POSITIONS)
+try:
+    from config import TICKER_RECORD_PATH
+except ImportError:
+    TICKER_RECORD_PATH = None
+
+try:
+    from config import METRICS_PATH, METRICS_INTERVAL
+except ImportError:
+    METRICS_PATH, METRICS_INTERVAL = None, 10
+
+try:
+    from config import TRADE_JOURNAL_DIR
+except ImportError:
+    TRADE_JOURNAL_DIR = "trade_journal"
+
+try:
+    from config import TRADE_EVENTS_PATH
+except ImportError:
+    TRADE_EVENTS_PATH = None
+
+try:
+    from config import FEATURE_WINDOW, MIN_TREND_PCT, MAX_VOLATILITY_PCT
+except ImportError:
+    FEATURE_WINDOW, MIN_TREND_PCT, MAX_VOLATILITY_PCT = 20, None, None
+
+try:
+    from config import EXECUTION_BOOKS, EXECUTION_LATENCY
+except ImportError:
+    EXECUTION_BOOKS, EXECUTION_LATENCY = None, 0.0
+
+try:
+    from config import STATUS_HOST, STATUS_PORT, STATUS_SOCKET
+except ImportError:
+    STATUS_HOST, STATUS_PORT, STATUS_SOCKET = "127.0.0.1", 8090, None
+
+try:
+    from config import CHECKPOINT_PATH, CHECKPOINT_INTERVAL
+except ImportError:
+    CHECKPOINT_PATH, CHECKPOINT_INTERVAL = None, 5
+
+# Command-line entry point. `python bot.py` trades live; the other commands
+# hand their arguments to the matching script's main(). Each command imports
+# only the modules it runs, and importing bot.py builds nothing, opens no
+# files and makes no requests.
+COMMANDS = {
+    "backtest": ("backtest", "replay a ticker recording through the simulator"),
+    "evolve": ("genetic_evolution", "evolve the momentum threshold"),
+    "sweep": ("sweep", "grid / random / successive-halving parameter search"),
+    "plot": ("plot_evolution", "plot evolution or sweep results"),
+    "books": ("execution", "record orderbook snapshots for execution-aware backtests"),
+}
 
-def tickers_loop():
-    while True:
-        try:
-            tickers = api.get_tickers()
-            if not tickers:
-                logging.warning("No tickers returned.")
-                time.sleep(2)
-                continue
 
-            signals = detect_signals(tickers, limit=MAX_POSITIONS)
-            for symbol, signal in signals.items():
-                if symbol not in tickers:
+class LiveBot:
+    def __init__(self):
+        from simulator import Portfolio
+        from exchange import KrakenFuturesAPI
+        from backtest import open_recorder
+        from metrics import Metrics
+        from journal import TradeJournal
+        from checkpoint import Checkpointer, restore
+        from features import FeatureStore
+        from eventlog import EventLog
+        from execution import open_fill_model
+
+        self.api = KrakenFuturesAPI()
+        self.metrics = Metrics(path=METRICS_PATH, interval=METRICS_INTERVAL)
+        self.portfolio = Portfolio(initial_cash=STARTING_CAPITAL, max_open_positions=MAX_POSITIONS, metrics=self.metrics,
+                                   journal=TradeJournal(TRADE_JOURNAL_DIR) if TRADE_JOURNAL_DIR else None,
+                                   events=EventLog(TRADE_EVENTS_PATH) if TRADE_EVENTS_PATH else None,
+                                   execution=open_fill_model(EXECUTION_BOOKS, EXECUTION_LATENCY) if EXECUTION_BOOKS else None)
+        self.recorder = open_recorder(TICKER_RECORD_PATH) if TICKER_RECORD_PATH else None
+        gated = MIN_TREND_PCT is not None or MAX_VOLATILITY_PCT is not None
+        self.features = FeatureStore(FEATURE_WINDOW) if gated else None
+        self.checkpointer = Checkpointer(CHECKPOINT_PATH, CHECKPOINT_INTERVAL) if CHECKPOINT_PATH else None
+        self.restored = restore(self.portfolio, CHECKPOINT_PATH) if CHECKPOINT_PATH else None
+        if self.restored:
+            print(f"Resumed session from {CHECKPOINT_PATH}: ${self.portfolio.cash:.2f} cash, "
+                  f"{len(self.portfolio.positions)} open positions")
+
+    def tickers_loop(self):
+        from strategy import SignalEngine
+        from ticker_buffer import TickerBuffer
+        from checkpoint import reconcile
+
+        api, metrics, portfolio = self.api, self.metrics, self.portfolio
+        engine = SignalEngine()
+        unreconciled = bool(self.restored)
+        buffer = TickerBuffer()  # reused every poll; rows stay valid until the next fetch
+        while True:
+            try:
+                with metrics.stage("fetch"):
+                    tickers = api.get_tickers_into(buffer)
+                if not tickers:
+                    metrics.incr("empty_fetches")
+                    logging.warning("No tickers returned.")
+                    time.sleep(2)
                     continue
-                portfolio.execute_trade(
-                    symbol=symbol,
-                    direction=signal["direction"],
-                    data=tickers[symbol],
-                    leverage=signal.get("leverage"),
-                    scalp=signal.get("scalp", False),
-                    simulate=not DRY_RUN
-                )
-            yield tickers
-            time.sleep(SLEEP_DELAY)
-        except Exception as e:
-            logging.error(f"Error in tickers_loop: {e}")
-            time.sleep(2)
-
-try:
-    if DEBUG_NO_UI:
-        print("Running in debug mode (no curses UI)...")
-        for _ in tickers_loop():
-            tickers = api.get_tickers()
-            if tickers:
-                portfolio.update_positions(tickers)
-    else:
-        portfolio.run_with_ui(tickers_loop())
-
-    portfolio.summary_report()
-except ImportError as e:
-    logging.error("ImportError: " + str(e))
-    print("Failed to import module:", e)
-except Exception as e:
-    logging.error("Runtime error: " + str(e))
-    print("Error:", e)
+                if self.recorder:
+                    self.recorder(tickers)
+                if unreconciled:
+                    reconcile(portfolio, tickers)
+                    unreconciled = False
+
+                with metrics.stage("signals"):
+                    allow = self.features.update(tickers).gate(MIN_TREND_PCT, MAX_VOLATILITY_PCT) if self.features else None
+                    signals = engine.update(tickers, limit=MAX_POSITIONS, allow=allow)
+                metrics.incr("signals", len(signals))
+                with metrics.stage("entries"):
+                    for symbol, signal in signals.items():
+                        if symbol not in tickers:
+                            continue
+                        portfolio.execute_trade(
+                            symbol=symbol,
+                            direction=signal["direction"],
+                            data=tickers[symbol],
+                            leverage=signal.get("leverage"),
+                            scalp=signal.get("scalp", False),
+                            simulate=not DRY_RUN
+                        )
+                yield tickers
+                metrics.maybe_export()
+                if portfolio.journal:
+                    portfolio.journal.maybe_flush()
+                if self.checkpointer:
+                    self.checkpointer.maybe_save(portfolio)
+                time.sleep(SLEEP_DELAY)
+            except Exception as e:
+                logging.error(f"Error in tickers_loop: {e}")
+                time.sleep(2)
+
+    def run_headless(self):
+        import asyncio
+        from async_exchange import AsyncKrakenFuturesAPI
+        from daemon import HeadlessBot, serve
+
+        print("Running headless (no curses UI)...")
+        bot = HeadlessBot(self.portfolio, AsyncKrakenFuturesAPI(), recorder=self.recorder,
+                          checkpointer=self.checkpointer, reconcile_first=bool(self.restored),
+                          simulate=not DRY_RUN, features=self.features,
+                          min_trend=MIN_TREND_PCT, max_volatility=MAX_VOLATILITY_PCT)
+        asyncio.run(serve(bot, STATUS_HOST, STATUS_PORT, STATUS_SOCKET))
+
+    def run(self, headless=DEBUG_NO_UI):
+        stopped = True
+        if headless:
+            self.run_headless()
+        else:
+            stopped = self.portfolio.run_with_ui(self.tickers_loop())
+
+        self.portfolio.summary_report(close=stopped)
+        if self.checkpointer:
+            # The last periodic checkpoint stands if trading never stopped
+            self.checkpointer.close(self.portfolio if stopped else None)
+        if METRICS_PATH:
+            self.metrics.export()
+
+
+def run_live(headless=DEBUG_NO_UI):
+    from simulator import configure_logging
+
+    configure_logging()
+    print(f"GPT Trading Bot v{__version__}")
+    try:
+        LiveBot().run(headless)
+    except ImportError as e:
+        logging.error("ImportError: " + str(e))
+        print("Failed to import module:", e)
+    except Exception as e:
+        logging.error("Runtime error: " + str(e))
+        print("Error:", e)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in COMMANDS:
+        # The command's own parser handles the rest, including --help
+        module = importlib.import_module(COMMANDS[argv[0]][0])
+        return module.main(argv[1:])
+
+    parser = argparse.ArgumentParser(description=f"GPT Trading Bot v{__version__}")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    live = commands.add_parser("live", help="trade live (the default)")
+    live.add_argument("--headless", action="store_true", default=DEBUG_NO_UI,
+                      help="no curses UI; serve state on the status API (DEBUG_NO_UI)")
+    for name, (_, summary) in COMMANDS.items():
+        commands.add_parser(name, help=summary)
+    args = parser.parse_args(argv)
+    run_live(getattr(args, "headless", DEBUG_NO_UI))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import fields
+
+from records import Direction, ExitReason, Position, Result, Trade
+
+# Crash-safe snapshots of a live Portfolio: cash, open positions, cooldowns
+# and the running TradeStats. The trading thread only copies the state into
+# plain lists (a few microseconds for a full book); a writer thread encodes
+# it, writes a temp file, fsyncs and renames it over the checkpoint, and
+# skips the write when nothing changed since the last one. The book is
+# bounded by MAX_POSITIONS, so rewriting the whole state is cheaper than
+# keeping a delta log.
+#
+# On startup restore() loads the file back into a fresh Portfolio, and
+# reconcile() settles the restored book against the first ticker poll.
+
+VERSION = 1
+POSITION_FIELDS = tuple(f.name for f in fields(Position))
+STATS_FIELDS = ("count", "wins", "total_gain", "total_capital", "roe_sum")
+
+
+def capture(portfolio):
+    # Plain-data copy of the state worth keeping across restarts
+    now = portfolio.clock()
+    marks = {}
+    for symbol in portfolio.positions:
+        data = portfolio.last_tickers.get(symbol)
+        if data:
+            marks[symbol] = float(data.get("markPrice", 0)) or None
+    return {
+        "version": VERSION,
+        "time": now,
+        "session_start": portfolio.session_start,
+        "cash": portfolio.cash,
+        "stats": [getattr(portfolio.stats, name) for name in STATS_FIELDS],
+        "cooldowns": {
+            symbol: started for symbol, started in portfolio.cooldowns.items()
+            if now - started < portfolio.cooldown_seconds
+        },
+        "positions": {
+            symbol: [getattr(pos, name) for name in POSITION_FIELDS] + [marks.get(symbol)]
+            for symbol, pos in portfolio.positions.items()
+        },
+    }
+
+
+def write(path, state):
+    # Write then rename so a crash mid-write leaves the previous checkpoint
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def restore(portfolio, path):
+    # Loads a checkpoint into `portfolio`; returns the saved time, or None
+    # when there is no usable checkpoint
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        logging.error(f"Ignoring unreadable checkpoint {path}: {e}")
+        return None
+    if state.get("version") != VERSION:
+        logging.error(f"Ignoring checkpoint {path} with version {state.get('version')}")
+        return None
+
+    portfolio.cash = state["cash"]
+    portfolio.session_start = state["session_start"]
+    for name, value in zip(STATS_FIELDS, state["stats"]):
+        setattr(portfolio.stats, name, value)
+    portfolio.cooldowns = dict(state["cooldowns"])
+    portfolio.positions.clear()
+    portfolio.restored_marks = {}
+    for symbol, values in state["positions"].items():
+        pos = Position(*values[:len(POSITION_FIELDS)])
+        pos.direction = Direction(pos.direction)
+        portfolio.positions[symbol] = pos
+        portfolio.restored_marks[symbol] = values[len(POSITION_FIELDS)]
+    logging.info(f"Restored checkpoint from {path}: cash ${portfolio.cash:.2f}, {len(portfolio.positions)} open positions")
+    return state["time"]
+
+
+def reconcile(portfolio, tickers):
+    # Settles a restored book against the first poll after startup: positions
+    # on symbols the exchange no longer lists are force-closed at their last
+    # saved mark (or entry) price. Positions still listed are left for the
+    # next update_positions, which sees any stop or target crossed while the
+    # bot was down. Returns the closed symbols.
+    marks = getattr(portfolio, "restored_marks", {})
+    closed = []
+    for symbol in list(portfolio.positions):
+        if symbol in tickers:
+            continue
+        pos = portfolio.positions[symbol]
+        entry = pos.entry_price
+        price = marks.get(symbol) or entry
+        pnl_pct = (price - entry) / entry if pos.direction == Direction.LONG else (entry - price) / entry
+        fee = portfolio.settings.get("TRADING_FEE", 0.0006) * 2 * pos.capital_used
+        funding = portfolio.settings.get("FUNDING_RATE_ESTIMATE", 0.0002) * pos.hours_held * entry * pos.size
+        net = pnl_pct * entry * pos.size - fee - funding
+        portfolio.cash += pos.capital_used + net
+        portfolio._record_trade(Trade(
+            symbol=symbol,
+            entry_price=entry,
+            exit_price=price,
+            capital_used=pos.capital_used,
+            gain=net,
+            roe=pnl_pct * pos.leverage,
+            result=Result.PROFIT if net > 0 else Result.LOSS,
+            exit_reason=ExitReason.FORCED_EXIT,
+            scalp=pos.scalp
+        ))
+        del portfolio.positions[symbol]
+        closed.append(symbol)
+        logging.info(f"[SIM] Closed {symbol} on restore: no longer listed")
+    portfolio.restored_marks = {}
+    return closed
+
+
+class Checkpointer:
+    def __init__(self, path, interval=5.0, clock=time.monotonic):
+        self.path = path
+        self.interval = interval
+        self.clock = clock
+        self.saves = 0
+        self._last = clock()
+        self._pending = None
+        self._written = None  # last state written, minus its timestamp
+        self._wake = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="checkpoint", daemon=True)
+        self._thread.start()
+
+    def maybe_save(self, portfolio):
+        # Called from the trading thread once per tick
+        now = self.clock()
+        if now - self._last >= self.interval:
+            self._last = now
+            self.save(portfolio)
+
+    def save(self, portfolio):
+        # Journal first, so every trade counted in the saved stats is on disk
+        if portfolio.journal:
+            portfolio.journal.flush()
+        state = capture(portfolio)
+        with self._wake:
+            self._pending = state  # a newer state replaces an unwritten one
+            self._wake.notify()
+
+    def _run(self):
+        while True:
+            with self._wake:
+                while self._pending is None and not self._closed:
+                    self._wake.wait()
+                state, self._pending = self._pending, None
+                if state is None:
+                    return
+            self._write(state)
+
+    def _write(self, state):
+        unchanged = dict(state, time=None)
+        if unchanged == self._written:
+            return
+        try:
+            write(self.path, state)
+        except OSError as e:
+            logging.error(f"Failed to write checkpoint {self.path}: {e}")
+            return
+        self._written = unchanged
+        self.saves += 1
+
+    def close(self, portfolio=None):
+        # Writes a final checkpoint of `portfolio` and stops the writer
+        if portfolio is not None:
+            self.save(portfolio)
+        with self._wake:
+            self._closed = True
+            self._wake.notify()
+        self._thread.join()
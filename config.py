@@ -14,8 +14,28 @@ MOMENTUM_THRESHOLD = 7.0   # % 24h change
 MIN_VOLUME = STARTING_CAPITAL * 5         # USD
 FUNDING_RATE_SHORT = 0.001
 FUNDING_RATE_LONG = 0.001
+FEATURE_WINDOW = 20        # ticks of history behind the rolling features
+MIN_TREND_PCT = None       # e.g. 0.3: window momentum must agree with the trade by this %
+MAX_VOLATILITY_PCT = None  # e.g. 0.5: skip symbols whose per-tick volatility is above this %
+
+# Exchange connection
+API_BASE_URL = "https://futures.kraken.com/derivatives/api/v3"
+REQUEST_TIMEOUT = 5        # seconds per HTTP request
+REQUEST_RETRIES = 3
 
 # Execution modes
 REAL_TRADING = False
 DRY_RUN = False
-DEBUG_NO_UI = False
\ No newline at end of file
+DEBUG_NO_UI = False         # headless: no curses UI, live state served on the status API below
+STATUS_HOST = "127.0.0.1"  # status API address in headless mode
+STATUS_PORT = 8090
+STATUS_SOCKET = None       # e.g. "/run/bot/status.sock" to serve on a unix socket instead
+TICKER_RECORD_PATH = None  # e.g. "tickers.tape" (binary) or "tickers.jsonl" to record every poll for backtest.py
+METRICS_PATH = None        # e.g. "metrics.json" or "metrics.prom" for a periodic latency/counter snapshot
+METRICS_INTERVAL = 10      # seconds between metrics snapshots
+TRADE_JOURNAL_DIR = "trade_journal"  # closed trades are appended to trades-NNNNNN.csv segments here
+TRADE_EVENTS_PATH = "trade_events.jsonl"  # JSON-lines entry/exit events, written off the trading thread; None disables
+CHECKPOINT_PATH = "portfolio_checkpoint.json"  # live portfolio state, restored on restart; None disables it
+CHECKPOINT_INTERVAL = 5    # seconds between checkpoints
+EXECUTION_BOOKS = None     # simulated fills walk orderbooks: "synthetic" or a recording from execution.py; None fills at markPrice
+EXECUTION_LATENCY = 0.0    # seconds before a simulated order reaches the book
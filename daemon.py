@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import signal
+import time
+
+from aiohttp import web
+
+from strategy import SignalEngine
+from ticker_buffer import TickerBuffer
+from checkpoint import reconcile
+from config import MAX_POSITIONS, SLEEP_DELAY
+
+# Headless bot: one asyncio loop polls the exchange once per tick, feeds the
+# same poll to signals, entries and exits, and serves the live state over a
+# small local HTTP API (TCP or unix socket) instead of a curses screen:
+#
+#   GET /status        cash, PnL, trade counts, tick count and age of the last poll
+#   GET /positions     open positions as of the last tick
+#   GET /metrics       stage latencies and counters in Prometheus text format
+#   GET /metrics.json  the same as JSON
+#
+# Handlers only read the last published snapshot, so a slow client never
+# delays a tick.
+
+
+class HeadlessBot:
+    def __init__(self, portfolio, api, recorder=None, checkpointer=None, reconcile_first=False,
+                 limit=MAX_POSITIONS, interval=SLEEP_DELAY, simulate=True, features=None, min_trend=None,
+                 max_volatility=None):
+        self.portfolio = portfolio
+        self.api = api
+        self.metrics = portfolio.metrics
+        self.recorder = recorder
+        self.checkpointer = checkpointer
+        self.reconcile_first = reconcile_first
+        self.limit = limit
+        self.interval = interval
+        self.simulate = simulate
+        self.engine = SignalEngine()
+        self.features = features  # FeatureStore gating signals on min_trend / max_volatility
+        self.gate = (min_trend, max_volatility)
+        self.buffer = TickerBuffer()
+        self.ticks = 0
+        self.last_tick = None
+        self.snapshot = portfolio.snapshot([])
+        self._stop = asyncio.Event()
+        portfolio.dashboard = self  # update_positions publishes a snapshot every tick
+
+    def publish(self, snapshot):
+        self.snapshot = snapshot
+
+    async def tick(self):
+        portfolio, metrics = self.portfolio, self.metrics
+        with metrics.stage("fetch"):
+            tickers = await self.api.get_tickers_into(self.buffer)
+        if not tickers:
+            metrics.incr("empty_fetches")
+            logging.warning("No tickers returned.")
+            return False
+        if self.recorder:
+            self.recorder(tickers)
+        if self.reconcile_first:
+            reconcile(portfolio, tickers)
+            self.reconcile_first = False
+
+        with metrics.stage("signals"):
+            allow = self.features.update(tickers).gate(*self.gate) if self.features else None
+            signals = self.engine.update(tickers, limit=self.limit, allow=allow)
+        metrics.incr("signals", len(signals))
+        with metrics.stage("entries"):
+            for symbol, sig in signals.items():
+                if symbol not in tickers:
+                    continue
+                portfolio.execute_trade(
+                    symbol=symbol,
+                    direction=sig["direction"],
+                    data=tickers[symbol],
+                    leverage=sig.get("leverage"),
+                    scalp=sig.get("scalp", False),
+                    simulate=self.simulate
+                )
+        portfolio.last_tickers = tickers
+        with metrics.stage("exits"):
+            portfolio.update_positions(tickers)
+
+        self.ticks += 1
+        self.last_tick = time.time()
+        metrics.maybe_export()
+        if portfolio.journal:
+            portfolio.journal.maybe_flush()
+        if self.checkpointer:
+            self.checkpointer.maybe_save(portfolio)
+        return True
+
+    async def run(self):
+        while not self._stop.is_set():
+            try:
+                delay = self.interval if await self.tick() else 2
+            except Exception as e:
+                logging.error(f"Error in headless loop: {e}")
+                delay = 2
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        snap, stats = self.snapshot, self.portfolio.stats
+        return {
+            "time": snap.time,
+            "uptime": snap.time - snap.session_start,
+            "cash": snap.cash,
+            "open_positions": len(snap.rows),
+            "open_pnl": sum(row.net for row in snap.rows),
+            "closed": stats.count,
+            "wins": stats.wins,
+            "win_rate": stats.win_rate,
+            "total_pnl": stats.total_gain,
+            "avg_roe": stats.avg_roe,
+            "ticks": self.ticks,
+            "last_tick_age": time.time() - self.last_tick if self.last_tick else None,
+            "flash": snap.flash_message,
+        }
+
+    def app(self):
+        async def status(request):
+            return web.json_response(self.status())
+
+        async def positions(request):
+            return web.json_response([row._asdict() for row in self.snapshot.rows])
+
+        async def prometheus(request):
+            return web.Response(text=self.metrics.prometheus(), content_type="text/plain")
+
+        async def metrics_json(request):
+            return web.json_response(self.metrics.snapshot())
+
+        app = web.Application()
+        app.router.add_get("/status", status)
+        app.router.add_get("/positions", positions)
+        app.router.add_get("/metrics", prometheus)
+        app.router.add_get("/metrics.json", metrics_json)
+        return app
+
+
+async def serve(bot, host="127.0.0.1", port=8090, socket_path=None):
+    # Runs `bot` until SIGINT/SIGTERM with its status API on `socket_path`
+    # when given, else on host:port
+    runner = web.AppRunner(bot.app())
+    await runner.setup()
+    if socket_path:
+        site = web.UnixSite(runner, socket_path)
+    else:
+        site = web.TCPSite(runner, host, port)
+    await site.start()
+    print(f"Status API at {site.name}")
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, bot.stop)
+    try:
+        await bot.run()
+    finally:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+        await runner.cleanup()
+        await bot.api.close()
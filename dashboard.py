@@ -0,0 +1,190 @@
+import curses
+import logging
+import threading
+import traceback
+
+from config import SLEEP_DELAY
+from simulator import load_settings
+
+FLASH_SECONDS = 3
+
+HEADER = (
+    f"{'SYMBOL':<14} {'DIR':<8} {'LEV':>5}  "
+    f"{'ROE%':>7}  {'PnL%':>7}  {'Net$':>9}  "
+    f"{'SL%':>6}  {'TP%':>6}  {'TS%':>6}  {'TYPE':>6}  {'DUR':>8}"
+)
+
+
+def _hms(seconds):
+    hrs, rem = divmod(int(seconds), 3600)
+    mins, secs = divmod(rem, 60)
+    return f"{hrs:02d}:{mins:02d}:{secs:02d}"
+
+
+class Dashboard:
+    # Curses view of a Portfolio. Trading runs on a background thread that
+    # publishes an immutable PortfolioSnapshot after every update_positions;
+    # the curses thread redraws the latest snapshot at most `fps` times per
+    # second and only rewrites rows whose text changed, so drawing never
+    # delays signal detection or exit evaluation.
+
+    def __init__(self, portfolio, fps=4):
+        self.portfolio = portfolio
+        self.fps = fps
+        self._snapshot = None
+        self._drawn_snapshot = None
+        self._drawn = []
+        self._size = None
+        self._stop = threading.Event()
+        self._done = threading.Event()
+        self.stopped = True  # False if quit while the trading thread was still busy
+
+    def publish(self, snapshot):
+        # Called from the trading thread; replacing the reference is atomic
+        self._snapshot = snapshot
+
+    def run(self, tickers_generator):
+        # Returns False when the trading thread could still be touching the
+        # portfolio, so the caller must not write it out
+        self.portfolio.dashboard = self
+        try:
+            curses.wrapper(self._main, tickers_generator)
+        finally:
+            self.portfolio.dashboard = None
+        return self.stopped
+
+    def _trade(self, tickers_generator):
+        portfolio = self.portfolio
+        try:
+            while not self._stop.is_set():
+                tickers = next(tickers_generator)
+                if self._stop.is_set():
+                    # Quit while this tick was fetching; the UI may already
+                    # have written the session out
+                    break
+                portfolio.last_tickers = tickers or {}
+                with portfolio.metrics.stage("exits"):
+                    portfolio.update_positions(tickers or {})
+        except StopIteration:
+            pass
+        except Exception:
+            logging.error("Trading loop error: " + traceback.format_exc())
+        finally:
+            self._done.set()
+
+    def _main(self, stdscr, tickers_generator):
+        curses.start_color()
+        curses.init_pair(1, curses.COLOR_RED, curses.COLOR_BLACK)
+        curses.init_pair(2, curses.COLOR_GREEN, curses.COLOR_BLACK)
+        curses.init_pair(3, curses.COLOR_YELLOW, curses.COLOR_BLACK)
+        try:
+            curses.curs_set(0)
+        except:
+            pass
+        # getch doubles as the frame limiter
+        stdscr.timeout(max(1, int(1000 / self.fps)))
+
+        trader = threading.Thread(target=self._trade, args=(tickers_generator,), name="trading", daemon=True)
+        trader.start()
+        while True:
+            c = stdscr.getch()
+            if c == ord('q'):
+                self._stop.set()
+                stdscr.erase()
+                stdscr.addstr(2, 2, "Stopping: waiting for the current tick to finish...", curses.color_pair(3))
+                stdscr.refresh()
+                trader.join(timeout=SLEEP_DELAY + 5)
+                # A fetch stuck in retries can outlast the wait; closing
+                # positions under a live update_positions would count them twice
+                self.stopped = not trader.is_alive()
+                if self.stopped:
+                    self.portfolio.close_all_positions()
+                self._show_summary(stdscr)
+                stdscr.timeout(-1)
+                while stdscr.getch() != ord('q'):
+                    pass
+                return
+            if c == ord('r'):
+                self.portfolio.settings = load_settings()
+                self.portfolio._flash("[Reloaded settings.json]")
+            if self._done.is_set():
+                return
+            try:
+                self._draw(stdscr)
+            except curses.error:
+                # Terminal too small for a row; try again next frame
+                self._drawn_snapshot = None
+
+    def _lines(self, snap, rows):
+        open_rows = snap.rows
+        scalp_net = sum(r.net for r in open_rows if r.scalp)
+        swing_net = sum(r.net for r in open_rows if not r.scalp)
+        win_rate = (snap.wins/snap.closed*100) if snap.closed else 0
+        total_allocated = sum(r.capital_used for r in open_rows)
+        total_net = sum(r.net for r in open_rows)
+
+        lines = [
+            (f"Time {_hms(snap.time - snap.session_start)}  Cash:${snap.cash:.2f}  Closed:{snap.closed}  Win:{win_rate:5.2f}%", 0),
+            (f"Alloc:${total_allocated:.2f}  OpenPnL:${total_net:.2f} (Scalp:${scalp_net:.2f} Swing:${swing_net:.2f})", 0),
+            (self.portfolio.metrics.status_line(), 0),
+        ]
+        if snap.flash_time is not None and snap.time - snap.flash_time < FLASH_SECONDS:
+            lines.append((snap.flash_message, curses.color_pair(2 if "+" in snap.flash_message else 1)))
+        else:
+            lines.append(("", 0))
+        lines.append((HEADER, curses.color_pair(3)))
+
+        for r in open_rows[:rows-6]:
+            # display slash when SL removed or TS not active
+            sl_disp = f"{r.stop_loss_pct * 100:>6.2f}%" if r.stop_loss_pct != 0 else f"{'/':>7}"
+            ts_disp = f"{r.trail_offset_pct * 100:>6.2f}%" if r.trailing_active else f"{'/':>7}"
+            tp_pct = (r.take_profit_pct or 0) * 100
+            trade_type = 'SCALP' if r.scalp else 'SWING'
+            dur_str = _hms(snap.time - r.open_time)
+
+            clr = curses.color_pair(2 if r.net > 0 else 1 if r.net < 0 else 3)
+            line = (
+                f"{r.symbol:<14} {r.direction:<8} {r.leverage:>5}  "
+                f"{r.roe*100:>7.2f}%  {r.pnl*100:>7.2f}%  ${r.net:>7.2f}  "
+                f"{sl_disp}  {tp_pct:>6.2f}%  {ts_disp}  "
+                f"{trade_type:>6}  {dur_str:>8}"
+            )
+            lines.append((line, clr))
+        return lines
+
+    def _draw(self, stdscr):
+        snap = self._snapshot
+        size = stdscr.getmaxyx()
+        if snap is None or (snap is self._drawn_snapshot and size == self._size):
+            return
+        if size != self._size:
+            stdscr.erase()
+            self._drawn = []
+            self._size = size
+        rows, cols = size
+
+        lines = self._lines(snap, rows)
+        for y, line in enumerate(lines):
+            if y < len(self._drawn) and self._drawn[y] == line:
+                continue
+            text, attr = line
+            stdscr.move(y, 0)
+            stdscr.clrtoeol()
+            if text:
+                stdscr.addnstr(y, 0, text, cols - 1, attr)
+        for y in range(len(lines), len(self._drawn)):
+            stdscr.move(y, 0)
+            stdscr.clrtoeol()
+        self._drawn = lines
+        self._drawn_snapshot = snap
+        stdscr.refresh()
+
+    def _show_summary(self, stdscr):
+        stdscr.erase()
+        lines = self.portfolio.session_summary()
+        if not self.stopped:
+            lines.append("Trading thread still busy: positions left open, no final checkpoint")
+        lines.append("Press 'q' again to exit")
+        for i, text in enumerate(lines):
+            stdscr.addstr(i+2, 2, text, curses.color_pair(3))
+        stdscr.refresh()
@@ -0,0 +1,407 @@
+import argparse
+import asyncio
+import bisect
+import heapq
+import itertools
+import json
+import math
+import time
+
+from backtest import SimulatedClock, open_snapshots
+from simulator import Portfolio, configure_logging
+from records import Direction, ExitReason, Result, Trade
+from strategy import SignalEngine
+from config import STARTING_CAPITAL, MAX_POSITIONS, SLEEP_DELAY
+
+# Event-driven exits. Instead of checking every position against the mark
+# price once per poll, positions react to individual price updates:
+#
+# - Each open position is armed with a price band. Below its lower level or
+#   above its upper level something can happen (stop, target, breakeven,
+#   trailing activation or a new trailing extreme); strictly inside the band
+#   nothing can, so the update is skipped.
+# - A TriggerIndex keeps the band edges of every armed position in sorted
+#   per-symbol lists, so a price update bisects to the positions it crossed and
+#   touches only those, however many portfolios share the index.
+# - A touched position runs the same rules as Portfolio.update_positions on
+#   the exact price that crossed, and closes at that price.
+# - Funding accrues by real elapsed time since entry rather than 1/12 hour
+#   per poll.
+
+# Bands are narrowed by this relative margin so float rounding near a level
+# can only cause an extra (no-op) evaluation, never a missed one
+BAND_MARGIN = 1e-9
+
+
+class TriggerIndex:
+    def __init__(self):
+        self._below = {}  # symbol -> sorted [(level, seq, owner)], touched when price <= level
+        self._above = {}  # symbol -> sorted [(level, seq, owner)], touched when price >= level
+        self._armed = {}  # (owner, symbol) -> (below entry, above entry)
+        self._seq = itertools.count()
+
+    def __contains__(self, symbol):
+        return symbol in self._below or symbol in self._above
+
+    def set(self, owner, symbol, lower, upper):
+        self.discard(owner, symbol)
+        seq = next(self._seq)
+        below = above = None
+        if lower > -math.inf:
+            below = (lower, seq, owner)
+            bisect.insort(self._below.setdefault(symbol, []), below)
+        if upper < math.inf:
+            above = (upper, seq, owner)
+            bisect.insort(self._above.setdefault(symbol, []), above)
+        self._armed[owner, symbol] = (below, above)
+
+    def discard(self, owner, symbol):
+        entries = self._armed.pop((owner, symbol), None)
+        if not entries:
+            return
+        for levels, entry in zip((self._below, self._above), entries):
+            if entry is None:
+                continue
+            items = levels[symbol]
+            del items[bisect.bisect_left(items, entry)]
+            if not items:
+                del levels[symbol]
+
+    def crossed(self, symbol, price):
+        # Owners whose band `price` reaches or leaves, each listed once
+        owners = []
+        below = self._below.get(symbol)
+        if below:
+            owners.extend(entry[2] for entry in below[bisect.bisect_left(below, (price,)):])
+        above = self._above.get(symbol)
+        if above:
+            owners.extend(entry[2] for entry in above[:bisect.bisect_right(above, (price, math.inf))])
+        return list(dict.fromkeys(owners))
+
+
+def band(pos):
+    # (lower, upper) price levels outside of which the position's state can change
+    entry = pos.entry_price
+    activation = 0.02 / pos.leverage
+    if pos.direction == Direction.LONG:
+        if pos.trailing_active:
+            lower, upper = pos.max_price * (1 - pos.trail_offset_pct), pos.max_price
+        else:
+            lower = entry * (1 - pos.stop_loss_pct)
+            upper = entry * (1 + pos.take_profit_pct) if pos.take_profit_pct else math.inf
+            if pos.scalp:
+                if not pos.breakeven_set:
+                    upper = min(upper, entry)
+                upper = min(upper, entry * (1 + activation))
+    else:
+        if pos.trailing_active:
+            lower, upper = pos.min_price, pos.min_price * (1 + pos.trail_offset_pct)
+        else:
+            upper = entry * (1 + pos.stop_loss_pct)
+            lower = entry * (1 - pos.take_profit_pct) if pos.take_profit_pct else -math.inf
+            if pos.scalp:
+                if not pos.breakeven_set:
+                    lower = max(lower, entry)
+                lower = max(lower, entry * (1 - activation))
+    return lower * (1 + BAND_MARGIN), upper * (1 - BAND_MARGIN)
+
+
+class EventPortfolio(Portfolio):
+    # Portfolio whose exits are driven by on_price(symbol, price). Several
+    # portfolios may share one TriggerIndex; dispatch() then routes an update
+    # to exactly the portfolios it concerns.
+
+    def __init__(self, initial_cash, max_open_positions=10, clock=time.time, metrics=None, journal=None, events=None,
+                 execution=None, index=None):
+        super().__init__(initial_cash, max_open_positions, clock, metrics, journal, events, execution)
+        self.index = TriggerIndex() if index is None else index
+        self.bands = {}
+        self.marks = {}
+
+    def execute_trade(self, symbol, direction, data, leverage=None, scalp=False, simulate=True):
+        held = symbol in self.positions
+        super().execute_trade(symbol, direction, data, leverage, scalp, simulate)
+        if not held and symbol in self.positions:
+            self._arm(symbol)
+
+    def _arm(self, symbol):
+        lower, upper = self.bands[symbol] = band(self.positions[symbol])
+        self.index.set(self, symbol, lower, upper)
+
+    def on_price(self, symbol, price):
+        pos = self.positions.get(symbol)
+        if not pos or not price:
+            return
+        self.marks[symbol] = price
+        direction = pos.direction
+        entry = pos.entry_price
+        pnl_pct = (price - entry) / entry if direction == Direction.LONG else (entry - price) / entry
+        roe_pct = pnl_pct * pos.leverage
+        pos.hours_held = (self.clock() - pos.open_time) / 3600
+
+        if direction == Direction.LONG:
+            pos.max_price = max(pos.max_price, price)
+        else:
+            pos.min_price = min(pos.min_price, price)
+
+        # Breakeven adjustment
+        if pos.scalp and pnl_pct > 0 and not pos.breakeven_set:
+            pos.stop_loss_pct = 0.0
+            pos.breakeven_set = True
+        # Trailing activation at 2% ROE
+        if pos.scalp and roe_pct >= 0.02 and not pos.trailing_active:
+            pos.take_profit_pct = None
+            pos.stop_loss_pct = 0.0
+            pos.trailing_active = True
+
+        exit_reason = None
+        if pos.trailing_active:
+            if direction == Direction.LONG and price < pos.max_price * (1 - pos.trail_offset_pct):
+                exit_reason = ExitReason.TRAILING_STOP
+            if direction == Direction.SHORT and price > pos.min_price * (1 + pos.trail_offset_pct):
+                exit_reason = ExitReason.TRAILING_STOP
+        else:
+            if pnl_pct <= -pos.stop_loss_pct:
+                exit_reason = ExitReason.STOP_LOSS
+            if pos.take_profit_pct and pnl_pct >= pos.take_profit_pct:
+                exit_reason = ExitReason.TAKE_PROFIT
+
+        if not exit_reason:
+            self._arm(symbol)
+            return
+
+        if self.execution:
+            price = self._exit_price(symbol, pos, price)
+            pnl_pct = (price - entry) / entry if direction == Direction.LONG else (entry - price) / entry
+            roe_pct = pnl_pct * pos.leverage
+        capital_used = pos.capital_used
+        fee_cost = self.settings.get("TRADING_FEE", 0.0006) * 2 * capital_used
+        funding   = self.settings.get("FUNDING_RATE_ESTIMATE", 0.0002) * pos.hours_held * entry * pos.size
+        gross     = pnl_pct * entry * pos.size
+        net_pnl   = gross - fee_cost - funding
+        self.cash += capital_used + net_pnl
+        result = Result.PROFIT if net_pnl > 0 else Result.LOSS
+        self._flash("Closed %s @ %.4f: %+.2f$ (%s)", symbol, price, net_pnl, result)
+        self._record_trade(Trade(
+            symbol=symbol,
+            entry_price=entry,
+            exit_price=price,
+            capital_used=capital_used,
+            gain=net_pnl,
+            roe=roe_pct,
+            result=result,
+            exit_reason=exit_reason,
+            scalp=pos.scalp
+        ))
+        del self.positions[symbol]
+        del self.bands[symbol]
+        self.index.discard(self, symbol)
+        self.metrics.incr("exits")
+
+    def close_all_positions(self):
+        # hours_held is only refreshed on touched updates; bring it up to date
+        now = self.clock()
+        for symbol, pos in self.positions.items():
+            pos.hours_held = (now - pos.open_time) / 3600
+            self.index.discard(self, symbol)
+        self.bands.clear()
+        super().close_all_positions()
+
+    def update_positions(self, tickers):
+        # Poll-driven entry point: each held symbol's mark price is one event
+        for symbol in sorted(self.positions):
+            data = tickers.get(symbol)
+            if not data:
+                continue
+            price = float(data.get("markPrice", 0))
+            if not price or not math.isfinite(price):
+                continue
+            self.marks[symbol] = price
+            lower, upper = self.bands[symbol]
+            if price <= lower or price >= upper:
+                self.on_price(symbol, price)
+
+        if self.dashboard:
+            self.dashboard.publish(self.snapshot(self._open_lines()))
+
+    def _open_lines(self):
+        lines = []
+        for symbol in sorted(self.positions):
+            pos = self.positions[symbol]
+            price = self.marks.get(symbol, pos.entry_price)
+            entry = pos.entry_price
+            pnl_pct = (price - entry) / entry if pos.direction == Direction.LONG else (entry - price) / entry
+            hours = (self.clock() - pos.open_time) / 3600
+            fee_cost = self.settings.get("TRADING_FEE", 0.0006) * 2 * pos.capital_used
+            funding   = self.settings.get("FUNDING_RATE_ESTIMATE", 0.0002) * hours * entry * pos.size
+            net = pnl_pct * entry * pos.size - fee_cost - funding
+            lines.append((symbol, pos, pnl_pct * pos.leverage, pnl_pct, net, price))
+        return lines
+
+
+def dispatch(index, symbol, price):
+    for owner in index.crossed(symbol, price):
+        owner.on_price(symbol, price)
+
+
+def load_prices(path):
+    # Streams (timestamp, symbol, price) from JSON lines {"time", "symbol", "price"}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                event = json.loads(line)
+                yield float(event["time"]), event["symbol"], float(event["price"])
+
+
+def snapshot_prices(snapshots):
+    # Mark prices of recorded polls as a (coarse) price stream
+    for timestamp, tickers in snapshots:
+        for symbol, data in tickers.items():
+            try:
+                price = float(data.get("markPrice", 0))
+            except (TypeError, ValueError):
+                continue
+            if price:
+                yield timestamp, symbol, price
+
+
+class EventRunner:
+    # Drives one or more EventPortfolios sharing a TriggerIndex: polls open
+    # positions, price updates close them
+    def __init__(self, portfolios, index, clock, threshold=None, limit=MAX_POSITIONS):
+        self.portfolios = portfolios
+        self.index = index
+        self.clock = clock
+        self.engine = SignalEngine(override_threshold=threshold)
+        self.limit = limit
+        self.events = 0
+
+    def on_tickers(self, timestamp, tickers):
+        self.clock.now = timestamp
+        if not tickers:
+            return
+        signals = self.engine.update(tickers, limit=self.limit)
+        for portfolio in self.portfolios:
+            for symbol, signal in signals.items():
+                if symbol not in tickers:
+                    continue
+                portfolio.execute_trade(
+                    symbol=symbol,
+                    direction=signal["direction"],
+                    data=tickers[symbol],
+                    leverage=signal.get("leverage"),
+                    scalp=signal.get("scalp", False),
+                    simulate=True
+                )
+            portfolio.last_tickers = tickers
+
+    def on_price(self, timestamp, symbol, price):
+        self.clock.now = timestamp
+        self.events += 1
+        if symbol in self.index:
+            dispatch(self.index, symbol, price)
+
+
+def run_event_backtest(snapshots, prices=None, threshold=None, portfolio=None):
+    # Polls from `snapshots` open positions; the time-ordered `prices` stream
+    # (defaults to the polls' own mark prices) closes them. A poll is applied
+    # before price updates with the same timestamp, like a tick's
+    # execute_trade before its update_positions.
+    clock = SimulatedClock()
+    index = TriggerIndex()
+    if portfolio is None:
+        portfolio = EventPortfolio(initial_cash=STARTING_CAPITAL, max_open_positions=MAX_POSITIONS, clock=clock, index=index)
+    else:
+        portfolio.clock, portfolio.index = clock, index
+    portfolio.dashboard = None
+    runner = EventRunner([portfolio], index, clock, threshold=threshold)
+    if prices is None:
+        snapshots = list(snapshots)
+        prices = snapshot_prices(snapshots)
+    polls = ((timestamp, 0, tickers) for timestamp, tickers in snapshots)
+    updates = ((timestamp, 1, (symbol, price)) for timestamp, symbol, price in prices)
+    started = time.perf_counter()
+    first = True
+    for timestamp, kind, payload in heapq.merge(polls, updates, key=lambda event: event[:2]):
+        if kind == 1:
+            runner.on_price(timestamp, *payload)
+            continue
+        if first:
+            portfolio.session_start = timestamp
+            first = False
+        runner.on_tickers(timestamp, payload)
+    return portfolio, runner.events, time.perf_counter() - started
+
+
+async def websocket_prices(url, symbols=None):
+    # Yields (timestamp, symbol, price) from a Kraken Futures style ticker feed
+    import aiohttp
+
+    async with aiohttp.ClientSession() as session:
+        async with session.ws_connect(url) as ws:
+            await ws.send_json({"event": "subscribe", "feed": "ticker", "product_ids": list(symbols or [])})
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    break
+                data = json.loads(message.data)
+                if data.get("feed") != "ticker" or "markPrice" not in data:
+                    continue
+                yield data.get("time", time.time() * 1000) / 1000, data["product_id"], float(data["markPrice"])
+
+
+async def run_live(ws_url, api, threshold=None, poll_interval=SLEEP_DELAY):
+    # Polls tickers for entries on one task while the websocket feed drives exits
+    clock = SimulatedClock(time.time())
+    index = TriggerIndex()
+    portfolio = EventPortfolio(initial_cash=STARTING_CAPITAL, max_open_positions=MAX_POSITIONS, clock=clock, index=index)
+    runner = EventRunner([portfolio], index, clock, threshold=threshold)
+
+    async def poll():
+        while True:
+            runner.on_tickers(time.time(), await api.get_tickers())
+            await asyncio.sleep(poll_interval)
+
+    poller = asyncio.create_task(poll())
+    try:
+        async for timestamp, symbol, price in websocket_prices(ws_url):
+            runner.on_price(max(timestamp, clock.now), symbol, price)
+    finally:
+        poller.cancel()
+    return portfolio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Event-driven exit simulation over a price stream")
+    parser.add_argument("snapshots", nargs="?", help="ticker tape (*.tape) or JSON-lines recording used for entries")
+    parser.add_argument("--prices", help='JSON-lines price stream {"time", "symbol", "price"}; defaults to the recording\'s mark prices')
+    parser.add_argument("--ws", help="websocket ticker feed URL (e.g. the stub_exchange /ws endpoint) for a live run")
+    parser.add_argument("--threshold", type=float, default=None, help="override MOMENTUM_THRESHOLD")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    if args.ws:
+        from async_exchange import AsyncKrakenFuturesAPI
+
+        async def live():
+            async with AsyncKrakenFuturesAPI() as api:
+                return await run_live(args.ws, api, threshold=args.threshold)
+
+        try:
+            portfolio = asyncio.run(live())
+        except KeyboardInterrupt:
+            return
+        events = elapsed = None
+    else:
+        if not args.snapshots:
+            parser.error("a recording is required unless --ws is given")
+        prices = load_prices(args.prices) if args.prices else None
+        portfolio, events, elapsed = run_event_backtest(open_snapshots(args.snapshots), prices, threshold=args.threshold)
+
+    print(f"Trades: {portfolio.stats.count}  Open: {len(portfolio.positions)}")
+    print(f"Total PnL: ${portfolio.stats.total_gain:.2f}  Final Cash: ${portfolio.cash:.2f}")
+    if events is not None:
+        print(f"Processed {events} price updates in {elapsed:.2f}s ({events / elapsed if elapsed else 0:.0f}/sec)")
+
+
+if __name__ == "__main__":
+    main()
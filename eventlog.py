@@ -0,0 +1,109 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Logging that stays off the trading path. Trade events are JSON lines
+# written by a background thread: emit() only puts a tuple of raw values on a
+# queue, and the writer drains whatever has piled up, encodes it, writes it
+# with one call and flushes once per batch. The file is rotated by size
+# (trade_events.jsonl -> .1 -> .2 ...), checked after each batch. Events
+# below `level` are dropped in emit() before they reach the queue.
+#
+# A Portfolio only emits when it was given an EventLog, so backtests,
+# sweeps and evolution runs, which don't pass one, skip event building
+# entirely.
+
+MAX_BYTES = 16 << 20
+BACKUPS = 3
+_STOP = object()
+
+
+class EventLog:
+    def __init__(self, path, max_bytes=MAX_BYTES, backups=BACKUPS, batch=1024, level=logging.INFO):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.batch = batch
+        self.level = level
+        self.written = 0
+        self._queue = queue.SimpleQueue()
+        self._file = open(path, "a")
+        self._thread = threading.Thread(target=self._run, name="eventlog", daemon=True)
+        self._thread.start()
+
+    def emit(self, event, fields, timestamp=None, level=logging.INFO):
+        # `fields` is encoded on the writer thread; pass plain values
+        if level >= self.level:
+            self._queue.put((time.time() if timestamp is None else timestamp, event, fields))
+
+    def _run(self):
+        get, get_nowait = self._queue.get, self._queue.get_nowait
+        while True:
+            batch = [get()]
+            while len(batch) < self.batch:
+                try:
+                    batch.append(get_nowait())
+                except queue.Empty:
+                    break
+            stop = next((i for i, item in enumerate(batch) if item is _STOP), None)
+            if stop is not None:
+                if stop + 1 < len(batch):
+                    logging.warning(f"Dropped {len(batch) - stop - 1} trade events emitted after close()")
+                del batch[stop:]
+            if batch:
+                self._write(batch)
+            if stop is not None:
+                return
+
+    def _write(self, batch):
+        lines = []
+        for timestamp, event, fields in batch:
+            lines.append(json.dumps({"time": timestamp, "event": event, **fields}, default=float))
+        try:
+            self._file.write("\n".join(lines) + "\n")
+            self._file.flush()
+            self.written += len(lines)
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+        except OSError as e:
+            logging.error(f"Failed to write trade events to {self.path}: {e}")
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "a")
+
+    def close(self):
+        # Writes everything emitted so far, then stops the writer
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        self._file.close()
+
+
+def start_logging(path, max_bytes=MAX_BYTES, backups=BACKUPS, level=logging.INFO,
+                  fmt="%(asctime)s - %(message)s"):
+    # Routes the root logger through a queue to a size-rotated file written
+    # by a listener thread. Safe to call more than once.
+    root = logging.getLogger()
+    if any(isinstance(handler, QueueHandler) for handler in root.handlers):
+        return
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+    handler.setFormatter(logging.Formatter(fmt))
+    records = queue.SimpleQueue()
+    listener = QueueListener(records, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    root.addHandler(QueueHandler(records))
+    root.setLevel(level)
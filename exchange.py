@@ -4,15 +4,18 @@ import requests
 import hmac
 import hashlib
 import time
-from config import DRY_RUN, REAL_TRADING
+from config import DRY_RUN, REAL_TRADING, API_BASE_URL, REQUEST_TIMEOUT
 
 class KrakenFuturesAPI:
-    def __init__(self):
-        self.base_url = "https://futures.kraken.com/derivatives/api/v3"
+    def __init__(self, base_url=API_BASE_URL, timeout=REQUEST_TIMEOUT):
+        self.base_url = base_url
+        self.timeout = timeout
+        # Keep-alive session so each tick reuses the same TLS connection
+        self.session = requests.Session()
 
     def get_tickers(self):
         try:
-            response = requests.get(f"{self.base_url}/tickers")
+            response = self.session.get(f"{self.base_url}/tickers", timeout=self.timeout)
             response.raise_for_status()
             data = response.json()
             return {item["symbol"]: item for item in data.get("tickers", [])}
@@ -20,6 +23,18 @@ class KrakenFuturesAPI:
             logging.error(f"Failed to fetch tickers: {e}")
             return {}
 
+    def get_tickers_into(self, buffer):
+        # Parses the raw response body straight into a TickerBuffer; returns
+        # the buffer, or an empty dict when the fetch fails
+        try:
+            response = self.session.get(f"{self.base_url}/tickers", timeout=self.timeout)
+            response.raise_for_status()
+            buffer.load_json(response.content)
+            return buffer
+        except Exception as e:
+            logging.error(f"Failed to fetch tickers: {e}")
+            return {}
+
     def place_order(self, symbol, side, size, price=None, leverage=None):
         if DRY_RUN:
             logging.info(
@@ -0,0 +1,263 @@
+import argparse
+import asyncio
+import bisect
+import json
+import math
+import random
+import time
+from collections import namedtuple
+from itertools import accumulate
+
+# Order execution against L2 orderbooks for simulated trading. Instead of
+# filling at markPrice, a market order walks the levels on the far side of
+# the book (asks for a buy, bids for a sell) until its size is done:
+#
+#   price         VWAP of the levels consumed
+#   size          quantity filled; less than `requested` when the book runs out
+#   slippage_bps  how much worse than the mark the VWAP is, in basis points
+#
+# Each side of a book is kept as sorted level prices next to running sums of
+# quantity and notional, so a fill is one bisect over the cumulative quantity
+# plus the partial last level, whatever the depth. Books come from
+#
+#   RecordedBooks   JSON-lines snapshots {"time", "symbol", "bids", "asks"}
+#                   (see record_book / `python execution.py books.jsonl`), looked
+#                   up by time, so a latency of L fills an order against the
+#                   book as it was L seconds after the decision
+#   SyntheticBooks  a fixed ladder scaled around the current mark, shaped like
+#                   the stub exchange's /orderbook; latency moves the mid by a
+#                   random walk of `drift_bps` per sqrt(second)
+#
+# Exits fill the whole position: any quantity past the last level is priced
+# at that level.
+
+Fill = namedtuple("Fill", ["price", "size", "requested", "slippage_bps"])
+
+
+class BookSide:
+    __slots__ = ("prices", "cum_size", "cum_notional")
+
+    def __init__(self, levels, descending):
+        levels = sorted(((float(p), float(q)) for p, q in levels if float(q) > 0),
+                        key=lambda level: level[0], reverse=descending)
+        self.prices = [p for p, _ in levels]
+        self.cum_size = list(accumulate(q for _, q in levels))
+        self.cum_notional = list(accumulate(p * q for p, q in levels))
+
+    def walk(self, size):
+        # (filled, cost, last level price) of taking `size` from this side
+        cum = self.cum_size
+        if not cum or size <= 0:
+            return 0.0, 0.0, 0.0
+        k = bisect.bisect_left(cum, size)
+        if k == len(cum):
+            return cum[-1], self.cum_notional[-1], self.prices[-1]
+        if k == 0:
+            return size, size * self.prices[0], self.prices[0]
+        return size, self.cum_notional[k - 1] + (size - cum[k - 1]) * self.prices[k], self.prices[k]
+
+
+class OrderBook:
+    __slots__ = ("bids", "asks")
+
+    def __init__(self, bids, asks):
+        self.bids = BookSide(bids, descending=True)
+        self.asks = BookSide(asks, descending=False)
+
+    @classmethod
+    def from_kraken(cls, book):
+        # {"bids": [[price, qty], ...], "asks": [...]} as served by /orderbook
+        return cls(book.get("bids", []), book.get("asks", []))
+
+    def walk(self, side, size):
+        return (self.asks if side == "buy" else self.bids).walk(size)
+
+
+class SyntheticBooks:
+    def __init__(self, depth=10, tick_bps=1.0, level_notional=1000.0, drift_bps=0.0, seed=0):
+        # Level i sits (i + 1) ticks from the mid and holds about
+        # level_notional * (i + 1) of quote currency, with the same random
+        # jitter as the stub exchange. Sizes are set in notional so the
+        # ladder fits any price; both sides are mirror images.
+        rng = random.Random(seed)
+        self.offsets = [tick_bps * 1e-4 * (i + 1) for i in range(depth)]
+        notional = [level_notional * rng.uniform(0.5, 5.0) * (i + 1) / 2.75 for i in range(depth)]
+        self.cum_notional = list(accumulate(notional))
+        # Quote spent per quote of mid-valued size, per side: sum((1 +/- offset) * notional)
+        self.cum_ask = list(accumulate((1 + o) * n for o, n in zip(self.offsets, notional)))
+        self.cum_bid = list(accumulate((1 - o) * n for o, n in zip(self.offsets, notional)))
+        self.drift = drift_bps * 1e-4
+        self.rng = random.Random(seed + 1)
+
+    def walk(self, symbol, side, size, mark, now, latency):
+        mid = mark
+        if self.drift and latency:
+            mid *= 1 + self.drift * math.sqrt(latency) * self.rng.gauss(0.0, 1.0)
+        sign, cum_cost = (1, self.cum_ask) if side == "buy" else (-1, self.cum_bid)
+        # Everything scales with the mid, so walk the ladder in notional terms
+        need = size * mid
+        cum = self.cum_notional
+        k = bisect.bisect_left(cum, need)
+        if k == len(cum):
+            return cum[-1] / mid, cum_cost[-1], mid * (1 + sign * self.offsets[-1])
+        level = 1 + sign * self.offsets[k]
+        before, spent = (cum[k - 1], cum_cost[k - 1]) if k else (0.0, 0.0)
+        return size, spent + (need - before) * level, mid * level
+
+
+class RecordedBooks:
+    def __init__(self, snapshots=(), max_age=60.0, fallback=None):
+        # Books older than `max_age` seconds at fill time count as missing;
+        # missing books go to `fallback` (e.g. SyntheticBooks), or the order
+        # fills at the mark when there is none
+        self.times = {}
+        self.books = {}
+        self.max_age = max_age
+        self.fallback = fallback
+        for timestamp, symbol, book in snapshots:
+            self.add(timestamp, symbol, book)
+
+    def add(self, timestamp, symbol, book):
+        times = self.times.setdefault(symbol, [])
+        books = self.books.setdefault(symbol, [])
+        if not isinstance(book, OrderBook):
+            book = OrderBook.from_kraken(book)
+        i = bisect.bisect_right(times, timestamp)
+        times.insert(i, timestamp)
+        books.insert(i, book)
+
+    def at(self, symbol, timestamp):
+        # Latest book of `symbol` at or before `timestamp`, None if there is none
+        times = self.times.get(symbol)
+        if not times:
+            return None
+        i = bisect.bisect_right(times, timestamp) - 1
+        if i < 0 or timestamp - times[i] > self.max_age:
+            return None
+        return self.books[symbol][i]
+
+    def walk(self, symbol, side, size, mark, now, latency):
+        book = self.at(symbol, now + latency)
+        if book is None:
+            if self.fallback:
+                return self.fallback.walk(symbol, side, size, mark, now, latency)
+            return None
+        return book.walk(side, size)
+
+
+class FillModel:
+    def __init__(self, books, latency=0.0):
+        self.books = books
+        self.latency = latency  # seconds between the decision and the order reaching the book
+        self.fills = 0
+        self.partial_fills = 0
+        self.unpriced = 0  # no book: filled at the mark
+        self.slippage_bps = 0.0  # summed over fills
+
+    def fill(self, symbol, side, size, mark, now, partial=True):
+        # `side` is "buy" or "sell". partial=False prices any size the book
+        # can't take at its last level, so the whole size is filled.
+        if not mark > 0:
+            # No usable mark to scale a book or measure slippage against
+            self.unpriced += 1
+            if partial:
+                return Fill(0.0, 0.0, size, 0.0)
+            return Fill(mark, size, size, 0.0)
+        walked = self.books.walk(symbol, side, size, mark, now, self.latency)
+        if walked is None:
+            self.unpriced += 1
+            filled, cost, last = size, size * mark, mark
+        else:
+            filled, cost, last = walked
+        if filled < size:
+            if partial:
+                self.partial_fills += 1
+            else:
+                cost += (size - filled) * (last or mark)
+                filled = size
+        if filled <= 0:
+            return Fill(0.0, 0.0, size, 0.0)
+        price = cost / filled
+        slippage = (price / mark - 1) * 1e4 if side == "buy" else (1 - price / mark) * 1e4
+        self.fills += 1
+        self.slippage_bps += slippage
+        return Fill(price, filled, size, slippage)
+
+    def summary(self):
+        return {
+            "fills": self.fills,
+            "partial_fills": self.partial_fills,
+            "unpriced": self.unpriced,
+            "avg_slippage_bps": self.slippage_bps / self.fills if self.fills else 0.0,
+        }
+
+
+def _book_line(timestamp, symbol, book):
+    return json.dumps({"time": timestamp, "symbol": symbol,
+                       "bids": book.get("bids", []), "asks": book.get("asks", [])}) + "\n"
+
+
+def record_book(path, symbol, book, timestamp=None):
+    with open(path, "a") as f:
+        f.write(_book_line(time.time() if timestamp is None else timestamp, symbol, book))
+
+
+def load_books(path):
+    # Streams (timestamp, symbol, book) from a JSON-lines file written by record_book
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            snapshot = json.loads(line)
+            yield float(snapshot["time"]), snapshot["symbol"], snapshot
+
+
+def open_fill_model(books, latency=0.0, max_age=60.0, seed=0):
+    # "synthetic" for generated ladders, else the path of recorded books
+    # (with synthetic ladders for symbols or times they don't cover)
+    synthetic = SyntheticBooks(seed=seed)
+    if books == "synthetic":
+        return FillModel(synthetic, latency)
+    return FillModel(RecordedBooks(load_books(books), max_age=max_age, fallback=synthetic), latency)
+
+
+async def record_books(api, path, symbols=None, polls=100, interval=1.0):
+    # Appends every symbol's orderbook to `path` once per poll, all fetched
+    # concurrently. Without `symbols` every listed contract is recorded.
+    if not symbols:
+        symbols = sorted(await api.get_tickers())
+    for i in range(polls):
+        started = time.time()
+        books = await asyncio.gather(*(api.get_orderbook(symbol) for symbol in symbols))
+        with open(path, "a") as f:
+            f.writelines(_book_line(started, symbol, book) for symbol, book in zip(symbols, books)
+                         if book.get("bids") or book.get("asks"))
+        if i + 1 < polls:
+            await asyncio.sleep(max(0.0, interval - (time.time() - started)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record L2 orderbook snapshots for execution-aware backtests")
+    parser.add_argument("path", help="JSON-lines file to append the books to")
+    parser.add_argument("--base-url", default=None, help="exchange or stub_exchange API root (default API_BASE_URL)")
+    parser.add_argument("--symbols", default=None, help="comma-separated symbols (default: every listed contract)")
+    parser.add_argument("--polls", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between polls")
+    args = parser.parse_args(argv)
+
+    from async_exchange import AsyncKrakenFuturesAPI
+
+    async def run():
+        kwargs = {"base_url": args.base_url} if args.base_url else {}
+        async with AsyncKrakenFuturesAPI(**kwargs) as api:
+            symbols = args.symbols.split(",") if args.symbols else None
+            await record_books(api, args.path, symbols, args.polls, args.interval)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import numpy as np
+
+from ticker_buffer import TickerBuffer
+
+# Rolling per-symbol market features, updated incrementally once per poll for
+# the whole universe. Log returns and quote volumes go into ring buffers of
+# `window` ticks with running sums beside them, so every update is O(1) per
+# symbol: the value leaving the window is subtracted and the new one added.
+# All features are arrays aligned with `symbols`:
+#
+#   momentum      % price change over the window
+#   volatility    standard deviation of per-tick returns over the window, %
+#   ema_trend     % gap between the fast and slow price EMAs
+#   volume_ratio  latest volumeQuote over its mean across the window
+#   ready         the window is full
+#
+# A symbol missing from a poll holds its last price (a zero return) and
+# volume for that tick.
+
+
+class FeatureStore:
+    def __init__(self, window=20, fast_span=5, slow_span=20, capacity=512):
+        self.window = window
+        self.fast_alpha = 2 / (fast_span + 1)
+        self.slow_alpha = 2 / (slow_span + 1)
+        self.symbols = []
+        self.index = {}
+        self.head = 0
+        self.ticks = 0
+        self._buffer = None
+        self._buffer_rows = np.zeros(0, dtype=np.intp)  # row of each _buffer row
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        n = len(self.symbols)
+        for name in ("price", "ema_fast", "ema_slow", "return_sum", "return_sq", "volume", "volume_sum"):
+            column = np.zeros(capacity)
+            if n:
+                column[:n] = getattr(self, name)[:n]
+            setattr(self, name, column)
+        count = np.zeros(capacity, dtype=np.int64)
+        returns = np.zeros((capacity, self.window))
+        volumes = np.zeros((capacity, self.window))
+        if n:
+            count[:n] = self.count[:n]
+            returns[:n] = self.returns[:n]
+            volumes[:n] = self.volumes[:n]
+        self.count, self.returns, self.volumes = count, returns, volumes
+        self.capacity = capacity
+
+    def _row(self, symbol):
+        row = len(self.symbols)
+        if row == self.capacity:
+            self._allocate(self.capacity * 2)
+        self.symbols.append(symbol)
+        self.index[symbol] = row
+        return row
+
+    def _gather(self, tickers):
+        # (rows, prices, volumes) of the poll; rows without a usable price are dropped
+        if isinstance(tickers, TickerBuffer):
+            if tickers is not self._buffer:
+                self._buffer, self._buffer_rows = tickers, np.zeros(0, dtype=np.intp)
+            mapped = self._buffer_rows
+            if len(mapped) < len(tickers.symbols):
+                extra = [self.index.get(s, -1) for s in tickers.symbols[len(mapped):]]
+                mapped = self._buffer_rows = np.concatenate([mapped, np.array(extra, dtype=np.intp)])
+            source = tickers.rows()
+            rows = mapped[source]
+            for i in np.flatnonzero(rows < 0):
+                symbol = tickers.symbols[source[i]]
+                rows[i] = mapped[source[i]] = self.index.get(symbol, -1)
+                if rows[i] < 0:
+                    rows[i] = mapped[source[i]] = self._row(symbol)
+            prices = tickers.columns["markPrice"][source]
+            volumes = tickers.columns["volumeQuote"][source]
+        else:
+            rows, prices, volumes = [], [], []
+            for symbol, data in tickers.items():
+                try:
+                    price = float(data.get("markPrice", 0))
+                except (TypeError, ValueError):
+                    continue
+                try:
+                    volume = float(data.get("volumeQuote", 0))
+                except (TypeError, ValueError):
+                    volume = 0.0
+                row = self.index.get(symbol)
+                rows.append(self._row(symbol) if row is None else row)
+                prices.append(price)
+                volumes.append(volume)
+            rows = np.array(rows, dtype=np.intp)
+            prices = np.array(prices)
+            volumes = np.array(volumes)
+        # A bad price drops the symbol for this poll; a bad volume reads as 0,
+        # as TickerBuffer stores an unparsable one
+        usable = (prices > 0) & np.isfinite(prices)
+        volumes = np.where(np.isfinite(volumes), volumes, 0.0)
+        return rows[usable], prices[usable], volumes[usable]
+
+    def update(self, tickers):
+        rows, prices, volumes = self._gather(tickers)
+        n = len(self.symbols)
+        price, volume = self.price[:n].copy(), self.volume[:n].copy()
+        seen = price > 0
+        price[rows] = prices
+        volume[rows] = volumes
+
+        # New symbols start from their first price: no return, EMAs at the price
+        first = ~seen & (price > 0)
+        self.ema_fast[:n][first] = self.ema_slow[:n][first] = price[first]
+        step = np.zeros(n)
+        step[seen] = np.log(price[seen] / self.price[:n][seen])
+
+        h = self.head
+        out_r, out_v = self.returns[:n, h].copy(), self.volumes[:n, h].copy()
+        self.return_sum[:n] += step - out_r
+        self.return_sq[:n] += step * step - out_r * out_r
+        self.volume_sum[:n] += volume - out_v
+        self.returns[:n, h] = step
+        self.volumes[:n, h] = volume
+        self.head = (h + 1) % self.window
+
+        active = price > 0
+        self.count[:n][active] += 1
+        self.ema_fast[:n] += self.fast_alpha * (price - self.ema_fast[:n])
+        self.ema_slow[:n] += self.slow_alpha * (price - self.ema_slow[:n])
+        self.price[:n] = price
+        self.volume[:n] = volume
+        self.ticks += 1
+        return self
+
+    def features(self):
+        n = len(self.symbols)
+        # Returns observed in the window: the first price of a symbol has none
+        observed = np.clip(self.count[:n] - 1, 0, self.window)
+        mean = self.return_sum[:n] / np.maximum(observed, 1)
+        var = (self.return_sq[:n] - observed * mean * mean) / np.maximum(observed - 1, 1)
+        filled = np.clip(self.count[:n], 1, self.window)
+        volume_mean = self.volume_sum[:n] / filled
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return {
+                "momentum": np.expm1(self.return_sum[:n]) * 100,
+                "volatility": np.sqrt(np.maximum(var, 0.0)) * 100,
+                "ema_trend": (self.ema_fast[:n] / self.ema_slow[:n] - 1) * 100,
+                "volume_ratio": np.where(volume_mean > 0, self.volume[:n] / volume_mean, 0.0),
+                "ready": observed >= self.window,
+            }
+
+    def get(self, symbol):
+        # Features of one symbol as floats, or None if it was never seen
+        row = self.index.get(symbol)
+        if row is None:
+            return None
+        return {name: values[row].item() for name, values in self.features().items()}
+
+    def gate(self, min_trend=None, max_volatility=None):
+        # allow(symbol, direction) for detect_signals / SignalEngine: the
+        # window momentum must point the trade's way by at least `min_trend` %
+        # and volatility stay at or under `max_volatility` %. Symbols with a
+        # partial window are held back. None when no limit is set.
+        if min_trend is None and max_volatility is None:
+            return None
+        f = self.features()
+        ok = f["ready"].copy()
+        if max_volatility is not None:
+            ok &= f["volatility"] <= max_volatility
+        ok_long, ok_short = ok.copy(), ok
+        if min_trend is not None:
+            ok_long &= f["momentum"] >= min_trend
+            ok_short &= f["momentum"] <= -min_trend
+        ok_long, ok_short = ok_long.tolist(), ok_short.tolist()
+        index = self.index
+
+        def allow(symbol, direction):
+            row = index.get(symbol)
+            if row is None or row >= len(ok_long):
+                return False
+            return ok_long[row] if direction == "long" else ok_short[row]
+        return allow
+
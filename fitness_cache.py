@@ -0,0 +1,112 @@
+import hashlib
+import json
+import sqlite3
+from collections import OrderedDict
+
+import config
+from simulator import load_settings
+
+# Config values that change what evaluate_strategy returns for a given gene
+CONFIG_KEYS = (
+    "STARTING_CAPITAL", "MAX_POSITIONS", "SLEEP_DELAY", "MIN_VOLUME",
+    "FUNDING_RATE_SHORT", "FUNDING_RATE_LONG", "FEATURE_WINDOW",
+)
+
+
+def dataset_fingerprint(tickers=None, path=None):
+    # Hash of the data a gene is scored on: a recording on disk, a single
+    # tickers snapshot, or a list of (timestamp, tickers) pairs
+    digest = hashlib.sha256()
+    if path:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    elif isinstance(tickers, dict):
+        digest.update(json.dumps(tickers, sort_keys=True).encode())
+    else:
+        for timestamp, snapshot in tickers:
+            digest.update(repr(timestamp).encode())
+            digest.update(json.dumps(snapshot, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def settings_fingerprint(settings=None, **extra):
+    settings = load_settings() if settings is None else settings
+    payload = {
+        "settings": settings,
+        "config": {key: getattr(config, key) for key in CONFIG_KEYS},
+        "extra": extra,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class FitnessCache:
+    # LRU of gene parameters -> fitness for one (dataset, settings) pair, with
+    # an optional SQLite file so later runs can skip already-scored genes.
+    # With `quantum` set, parameters are snapped to that grid before lookup and
+    # genes are scored at the snapped value, so near-identical children share
+    # one evaluation.
+
+    def __init__(self, dataset_key, settings_key, path=None, maxsize=100_000, quantum=None):
+        self.scope = f"{dataset_key}:{settings_key}"
+        self.maxsize = maxsize
+        self.quantum = quantum
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS fitness (scope TEXT, params TEXT, fitness REAL, PRIMARY KEY (scope, params))"
+            )
+
+    def params(self, gene):
+        threshold, *rest = gene.params()
+        if self.quantum:
+            threshold = round(round(threshold / self.quantum) * self.quantum, 10)
+        return (threshold, *rest)
+
+    def _key(self, params):
+        return json.dumps(params)
+
+    def get(self, params):
+        key = self._key(params)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT fitness FROM fitness WHERE scope = ? AND params = ?", (self.scope, key)
+            ).fetchone()
+            if row:
+                self.hits += 1
+                self._remember(key, row[0])
+                return row[0]
+        self.misses += 1
+        return None
+
+    def put(self, params, fitness):
+        key = self._key(params)
+        self._remember(key, fitness)
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO fitness VALUES (?, ?, ?)", (self.scope, key, fitness)
+            )
+
+    def _remember(self, key, fitness):
+        self._entries[key] = fitness
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def commit(self):
+        if self._db is not None:
+            self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.commit()
+            self._db.close()
+            self._db = None
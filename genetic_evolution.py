@@ -1,55 +1,154 @@
 
+import argparse
+import os
 import random
 import csv
-from strategy import detect_signals
-from simulator import Portfolio
-from exchange import KrakenFuturesAPI
-from config import STARTING_CAPITAL, MAX_POSITIONS
+from concurrent.futures import ProcessPoolExecutor
+from backtest import run_backtest, open_snapshots, replay
+from batch_evaluator import evaluate_thresholds
+from fitness_cache import FitnessCache, dataset_fingerprint, settings_fingerprint
+from simulator import configure_logging
 
 class StrategyGene:
-    def __init__(self, momentum_threshold):
+    # min_trend / max_volatility gate signals on rolling features (see
+    # features.py); None leaves a gate off and out of mutation
+    def __init__(self, momentum_threshold, min_trend=None, max_volatility=None):
         self.momentum_threshold = momentum_threshold
+        self.min_trend = min_trend
+        self.max_volatility = max_volatility
         self.fitness = 0.0
 
-    def mutate(self):
-        self.momentum_threshold += random.uniform(-1.0, 1.0)
+    def params(self):
+        if self.min_trend is None and self.max_volatility is None:
+            return (self.momentum_threshold,)
+        return (self.momentum_threshold, self.min_trend, self.max_volatility)
+
+    def mutate(self, rng=random):
+        self.momentum_threshold += rng.uniform(-1.0, 1.0)
         self.momentum_threshold = max(1.0, min(25.0, self.momentum_threshold))
+        if self.min_trend is not None:
+            self.min_trend = max(0.0, min(5.0, self.min_trend + rng.uniform(-0.2, 0.2)))
+        if self.max_volatility is not None:
+            self.max_volatility = max(0.05, min(5.0, self.max_volatility * rng.uniform(0.8, 1.25)))
 
 def evaluate_strategy(gene, tickers, ticks=50):
-    portfolio = Portfolio(initial_cash=STARTING_CAPITAL, max_open_positions=MAX_POSITIONS)
-    for _ in range(ticks):
-        signals = detect_signals(tickers, limit=MAX_POSITIONS, override_threshold=gene.momentum_threshold)
-        for symbol, signal in signals.items():
-            portfolio.execute_trade(
-                symbol=symbol,
-                direction=signal["direction"],
-                data=tickers[symbol],
-                leverage=signal.get("leverage"),
-                scalp=signal.get("scalp", False),
-                simulate=True
-            )
-        portfolio.update_positions(tickers)
-    total_gain = sum(trade["gain"] for trade in portfolio.trade_history)
-    total_capital = sum(trade["capital_used"] for trade in portfolio.trade_history)
+    # `tickers` is either one snapshot replayed `ticks` times or a recorded
+    # series of (timestamp, tickers) pairs from backtest.load_snapshots
+    snapshots = replay(tickers, ticks) if isinstance(tickers, dict) else tickers
+    portfolio = run_backtest(snapshots, threshold=gene.momentum_threshold,
+                             min_trend=gene.min_trend, max_volatility=gene.max_volatility).portfolio
+    total_gain = portfolio.stats.total_gain
+    total_capital = portfolio.stats.total_capital
     roe = (total_gain / total_capital) if total_capital > 0 else 0
     gene.fitness = roe
     return roe
 
-def evolve(population_size=10, generations=5):
-    api = KrakenFuturesAPI()
-    tickers = api.get_tickers()
+# Ticker data of a pool worker, loaded once by _init_worker instead of being
+# pickled along with every task
+_worker_tickers = None
+
+def _init_worker(tickers, snapshots_path):
+    global _worker_tickers
+    _worker_tickers = list(open_snapshots(snapshots_path)) if snapshots_path else tickers
+
+def _evaluate_params(params):
+    return evaluate_strategy(StrategyGene(*params), _worker_tickers)
+
+def _evaluate_thresholds_batched(thresholds):
+    return evaluate_thresholds(thresholds, _worker_tickers)
+
+def make_pool(workers, tickers=None, snapshots_path=None):
+    # With a snapshots_path each worker reads the recording itself, so the
+    # parent never ships the series to it
+    workers = workers if workers > 0 else os.cpu_count()
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(None if snapshots_path else tickers, snapshots_path),
+    )
+
+def evaluate_population(population, tickers, pool=None, cache=None, batched=False, workers=None):
+    # Fitness is deterministic in the gene, so the pool returns the same values
+    # as the serial loop. Genes sharing parameters (or already in the cache)
+    # are only scored once. `workers` is the pool's process count.
+    pending = {}
+    for gene in population:
+        params = cache.params(gene) if cache else gene.params()
+        fitness = cache.get(params) if cache else None
+        if fitness is None:
+            pending.setdefault(params, []).append(gene)
+        else:
+            gene.fitness = fitness
 
-    population = [StrategyGene(random.uniform(5.0, 15.0)) for _ in range(population_size)]
+    thresholds = [params[0] for params in pending]
+    chunksize = max(1, len(thresholds) // ((workers or os.cpu_count() or 1) * 4))
+    if batched and any(len(params) > 1 for params in pending):
+        raise ValueError("batched evaluation only scores momentum thresholds; drop the feature gates")
+    if batched and pool is None:
+        results = evaluate_thresholds(thresholds, tickers)
+    elif batched:
+        # One batched pass per chunk of the population
+        chunks = [thresholds[i:i + chunksize] for i in range(0, len(thresholds), chunksize)]
+        results = [fitness for chunk in pool.map(_evaluate_thresholds_batched, chunks) for fitness in chunk]
+    elif pool is None:
+        results = [evaluate_strategy(StrategyGene(*params), tickers) for params in pending]
+    else:
+        results = pool.map(_evaluate_params, list(pending), chunksize=chunksize)
 
-    with open("evolution_results.csv", "w", newline="") as csvfile:
+    for (params, genes), fitness in zip(pending.items(), results):
+        for gene in genes:
+            gene.fitness = fitness
+        if cache:
+            cache.put(params, fitness)
+    if cache:
+        cache.commit()
+
+def evolve(population_size=10, generations=5, snapshots_path=None, workers=1, seed=None,
+           cache_path=None, quantum=None, batched=False, features=False, out="evolution_results.csv"):
+    if snapshots_path:
+        # Pool workers load the recording themselves
+        tickers = list(open_snapshots(snapshots_path)) if workers == 1 else None
+    else:
+        from exchange import KrakenFuturesAPI
+        tickers = KrakenFuturesAPI().get_tickers()
+
+    cache = FitnessCache(
+        dataset_fingerprint(tickers, path=snapshots_path),
+        settings_fingerprint(ticks=50),
+        path=cache_path,
+        quantum=quantum,
+    )
+    rng = random.Random(seed)
+    workers = workers if workers > 0 else os.cpu_count()
+    pool = make_pool(workers, tickers, snapshots_path) if workers != 1 else None
+    try:
+        _evolve(population_size, generations, tickers, rng, pool, workers, cache, batched, features, out)
+    finally:
+        if pool:
+            pool.shutdown()
+        cache.close()
+    print(f"Fitness cache: {cache.hits} hits, {cache.misses} misses")
+
+def _evolve(population_size, generations, tickers, rng, pool, workers, cache, batched, features, out):
+    if features:
+        population = [StrategyGene(rng.uniform(5.0, 15.0), rng.uniform(0.0, 1.0), rng.uniform(0.2, 2.0))
+                      for _ in range(population_size)]
+    else:
+        population = [StrategyGene(rng.uniform(5.0, 15.0)) for _ in range(population_size)]
+
+    with open(out, "w", newline="") as csvfile:
         writer = csv.writer(csvfile)
-        writer.writerow(["Generation", "Gene#", "Momentum_Threshold", "ROE_Fitness"])
+        writer.writerow(["Generation", "Gene#", "Momentum_Threshold", "ROE_Fitness"]
+                        + (["Min_Trend", "Max_Volatility"] if features else []))
 
         for gen in range(generations):
             print(f"Generation {gen + 1}")
+            evaluate_population(population, tickers, pool, cache, batched, workers)
             for i, gene in enumerate(population):
-                evaluate_strategy(gene, tickers)
-                writer.writerow([gen + 1, i + 1, round(gene.momentum_threshold, 4), round(gene.fitness, 4)])
+                row = [gen + 1, i + 1, round(gene.momentum_threshold, 4), round(gene.fitness, 4)]
+                if features:
+                    row += [round(gene.min_trend, 4), round(gene.max_volatility, 4)]
+                writer.writerow(row)
 
             population.sort(key=lambda g: g.fitness, reverse=True)
             print("Top 3 thresholds:", [round(g.momentum_threshold, 2) for g in population[:3]])
@@ -58,11 +157,30 @@ def evolve(population_size=10, generations=5):
             survivors = population[:population_size // 2]
             new_gen = survivors.copy()
             while len(new_gen) < population_size:
-                child = StrategyGene(random.choice(survivors).momentum_threshold)
-                child.mutate()
+                child = StrategyGene(*rng.choice(survivors).params())
+                child.mutate(rng)
                 new_gen.append(child)
 
             population = new_gen
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evolve the momentum threshold")
+    parser.add_argument("snapshots", nargs="?", help="recorded tickers to evaluate on (default: one live poll)")
+    parser.add_argument("--population", type=int, default=10)
+    parser.add_argument("--generations", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1, help="fitness worker processes, 0 = all cores")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--cache", default=None, help="SQLite file that keeps scored genes across runs")
+    parser.add_argument("--quantum", type=float, default=None, help="snap thresholds to this grid before scoring")
+    parser.add_argument("--batched", action="store_true", help="score each generation in one vectorized pass")
+    parser.add_argument("--features", action="store_true", help="also evolve the rolling-feature gates (min trend, max volatility)")
+    parser.add_argument("--out", default="evolution_results.csv", help="CSV file for every scored gene")
+    args = parser.parse_args(argv)
+    if args.batched and args.features:
+        parser.error("--batched cannot score feature gates")
+    configure_logging()
+    evolve(args.population, args.generations, args.snapshots, args.workers, args.seed, args.cache, args.quantum,
+           args.batched, args.features, args.out)
+
 if __name__ == "__main__":
-    evolve()
+    main()
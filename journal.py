@@ -0,0 +1,116 @@
+import csv
+import os
+import time
+
+from records import FIELDS, ExitReason, Result, Trade
+
+# Append-only trade journal. Closed trades are buffered and written to CSV
+# segments (trades-000001.csv, trades-000002.csv, ...) in a directory; each
+# flush is followed by one fsync, and a segment is rotated once it grows past
+# `segment_bytes`. Every session starts a fresh segment, so a crash can at
+# worst leave a partial last line in the segment it was writing.
+
+
+class TradeStats:
+    # Running aggregates over closed trades, updated in O(1) per close
+    def __init__(self):
+        self.count = 0
+        self.wins = 0
+        self.total_gain = 0.0
+        self.total_capital = 0.0
+        self.roe_sum = 0.0
+
+    def add(self, trade):
+        self.count += 1
+        if trade.result == Result.PROFIT:
+            self.wins += 1
+        self.total_gain += trade.gain
+        self.total_capital += trade.capital_used
+        self.roe_sum += trade.roe
+
+    @property
+    def win_rate(self):
+        return self.wins / self.count if self.count else 0.0
+
+    @property
+    def avg_roe(self):
+        return self.roe_sum / self.count if self.count else 0.0
+
+
+def _segments(directory):
+    names = [n for n in os.listdir(directory) if n.startswith("trades-") and n.endswith(".csv")]
+    return sorted(os.path.join(directory, n) for n in names)
+
+
+class TradeJournal:
+    def __init__(self, directory, flush_every=20, flush_interval=5.0, segment_bytes=16 << 20, clock=time.monotonic):
+        self.directory = directory
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.segment_bytes = segment_bytes
+        self.clock = clock
+        self._buffer = []
+        self._last_flush = clock()
+        os.makedirs(directory, exist_ok=True)
+        existing = _segments(directory)
+        self._segment = int(os.path.basename(existing[-1])[7:-4]) if existing else 0
+        self._open_next()
+
+    def _open_next(self):
+        self._segment += 1
+        self.path = os.path.join(self.directory, f"trades-{self._segment:06d}.csv")
+        self.file = open(self.path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(FIELDS)
+
+    def append(self, trade):
+        self._buffer.append(trade)
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+        else:
+            self.maybe_flush()
+
+    def maybe_flush(self):
+        # Called once per tick too, so trades don't sit in the buffer while
+        # nothing else closes
+        if self._buffer and self.clock() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = self.clock()
+        if not self._buffer:
+            return
+        self.writer.writerows(trade.row() for trade in self._buffer)
+        self._buffer.clear()
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        if self.file.tell() >= self.segment_bytes:
+            self.file.close()
+            self._open_next()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def read_journal(directory):
+    # Streams every journaled Trade, oldest segment first
+    for path in _segments(directory):
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                try:
+                    trade = Trade(
+                        symbol=row["symbol"],
+                        entry_price=float(row["entry_price"]),
+                        exit_price=float(row["exit_price"]),
+                        capital_used=float(row["capital_used"]),
+                        gain=float(row["gain"]),
+                        roe=float(row["roe"]),
+                        result=Result(row["result"]),
+                        exit_reason=ExitReason(row["exit_reason"]),
+                        scalp=row["scalp"] == "True",
+                    )
+                except (TypeError, ValueError):
+                    # Partial line left by a crash mid-write
+                    continue
+                yield trade
@@ -0,0 +1,173 @@
+import json
+import os
+import time
+
+# Tick pipeline instrumentation: per-stage latency histograms plus counters.
+#
+# Histograms are HDR-style: latencies are recorded in microseconds into
+# log-linear buckets (HALF linear steps per power of two), so any reported
+# percentile is within ~1/HALF (under 2%) of the true value while a record()
+# is just a few integer ops and a list increment.
+
+SUB_BITS = 7
+SUB_BUCKETS = 1 << SUB_BITS
+HALF = SUB_BUCKETS >> 1
+MAX_SHIFT = 36  # ~2^41 us, about 25 days
+BUCKETS = SUB_BUCKETS + MAX_SHIFT * HALF
+
+
+def _bucket(us):
+    if us < SUB_BUCKETS:
+        return us
+    shift = us.bit_length() - SUB_BITS
+    if shift > MAX_SHIFT:
+        return BUCKETS - 1
+    return SUB_BUCKETS + (shift - 1) * HALF + (us >> shift) - HALF
+
+
+def _upper(bucket):
+    # Highest value that lands in the bucket
+    if bucket < SUB_BUCKETS:
+        return bucket
+    shift, step = divmod(bucket - SUB_BUCKETS, HALF)
+    shift += 1
+    return ((step + HALF + 1) << shift) - 1
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, us):
+        self.counts[_bucket(us)] += 1
+        self.count += 1
+        self.total += us
+        if us > self.max:
+            self.max = us
+
+    def percentile(self, q):
+        if not self.count:
+            return 0
+        rank = max(1, int(self.count * q + 0.5))
+        seen = 0
+        for bucket, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(_upper(bucket), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_us": self.total / self.count if self.count else 0,
+            "p50_us": self.percentile(0.5),
+            "p99_us": self.percentile(0.99),
+            "max_us": self.max,
+        }
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record((time.perf_counter_ns() - self.start) // 1000)
+
+
+class Metrics:
+    # Shared by bot.tickers_loop, the trading loop and Portfolio. Stages are
+    # timed with `with metrics.stage("fetch"):`; counters are plain ints and
+    # rejected trades are counted per reason. When `path` is set,
+    # maybe_export() rewrites it every `interval` seconds, as JSON or, for
+    # paths ending in .prom, Prometheus text exposition format.
+
+    def __init__(self, path=None, interval=10, clock=time.monotonic):
+        self.path = path
+        self.interval = interval
+        self.clock = clock
+        self.histograms = {}
+        self._timers = {}
+        self.counters = {}
+        self.rejected = {}
+        self._last_export = clock()
+
+    def stage(self, name):
+        timer = self._timers.get(name)
+        if timer is None:
+            self.histograms[name] = Histogram()
+            timer = self._timers[name] = _Timer(self.histograms[name])
+        return timer
+
+    def incr(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def reject(self, reason):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+
+    def snapshot(self):
+        return {
+            "time": time.time(),
+            "stages": {name: h.summary() for name, h in list(self.histograms.items())},
+            "counters": dict(self.counters),
+            "rejected": dict(self.rejected),
+        }
+
+    def prometheus(self):
+        snap = self.snapshot()
+        lines = [
+            "# TYPE bot_stage_latency_seconds summary",
+        ]
+        for name, s in snap["stages"].items():
+            for q, key in (("0.5", "p50_us"), ("0.99", "p99_us"), ("1", "max_us")):
+                lines.append(f'bot_stage_latency_seconds{{stage="{name}",quantile="{q}"}} {s[key] / 1e6:.6f}')
+            lines.append(f'bot_stage_latency_seconds_sum{{stage="{name}"}} {s["mean_us"] * s["count"] / 1e6:.6f}')
+            lines.append(f'bot_stage_latency_seconds_count{{stage="{name}"}} {s["count"]}')
+        for name, value in sorted(snap["counters"].items()):
+            lines.append(f"# TYPE bot_{name}_total counter")
+            lines.append(f"bot_{name}_total {value}")
+        lines.append("# TYPE bot_rejected_trades_total counter")
+        for reason, value in sorted(snap["rejected"].items()):
+            lines.append(f'bot_rejected_trades_total{{reason="{reason}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path=None):
+        path = path or self.path
+        if path.endswith(".prom"):
+            text = self.prometheus()
+        else:
+            text = json.dumps(self.snapshot(), indent=2)
+        # Write then rename so scrapers never read a half-written file
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    def maybe_export(self):
+        if not self.path:
+            return
+        now = self.clock()
+        if now - self._last_export >= self.interval:
+            self._last_export = now
+            self.export()
+
+    def status_line(self):
+        # One-line latency/counter summary for the curses dashboard
+        parts = [
+            f"{name}:{h.percentile(0.5)/1000:.1f}/{h.percentile(0.99)/1000:.1f}ms"
+            for name, h in list(self.histograms.items())
+        ]
+        c = self.counters
+        return (
+            "p50/p99 " + " ".join(parts)
+            + f"  Sig:{c.get('signals', 0)} In:{c.get('entries', 0)} Out:{c.get('exits', 0)}"
+            + f" Rej:{sum(self.rejected.values())}"
+        )
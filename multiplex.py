@@ -0,0 +1,368 @@
+import argparse
+import json
+import multiprocessing
+import time
+from collections.abc import Mapping
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from backtest import SimulatedClock, open_snapshots
+from simulator import Portfolio, configure_logging, load_settings
+from records import Direction
+from strategy import SignalEngine
+from config import STARTING_CAPITAL, MAX_POSITIONS, SLEEP_DELAY
+
+# Runs many Portfolio variants against one tick stream. Each tick the tickers
+# are fetched once, signals are detected once and mark prices are parsed once
+# into a PriceTable: one float64 per symbol, in rows assigned when a symbol
+# is first seen. Every variant reads prices from that array by row. Variants
+# can be sharded across worker processes that keep their portfolios for the
+# whole run; the array lives in shared memory, so each tick only ships the
+# signals and any newly listed symbols to them, and a shard's work grows with
+# the positions it holds rather than with the size of the universe.
+#
+# A variant is a dict of settings.json overrides; DEFAULT_LEVERAGE and
+# MAX_POSITIONS set the matching Portfolio attributes instead.
+
+
+def make_portfolio(overrides, clock, portfolio_cls=Portfolio, base_settings=None):
+    overrides = dict(overrides)
+    portfolio = portfolio_cls(
+        initial_cash=STARTING_CAPITAL,
+        max_open_positions=overrides.pop("MAX_POSITIONS", MAX_POSITIONS),
+        clock=clock,
+    )
+    portfolio.default_leverage = overrides.pop("DEFAULT_LEVERAGE", portfolio.default_leverage)
+    portfolio.settings = {**(load_settings() if base_settings is None else base_settings), **overrides}
+    return portfolio
+
+
+class PriceTable:
+    # Mark price per row, NaN for symbols missing from the latest poll. The
+    # parent fills it with load(); shards attach to the same block by name
+    # and learn new symbols through extend(), in the order load() added them.
+    def __init__(self, capacity=1024, shared=False, name=None):
+        self.shared = shared or name is not None
+        self.index = {}
+        self.symbols = []
+        self.shm = None
+        self._retired = []
+        if name is None:
+            self._allocate(capacity)
+        else:
+            self.attach(name)
+
+    def _allocate(self, capacity):
+        old = self.prices[:len(self.symbols)] if self.symbols else None
+        if self.shared:
+            shm = shared_memory.SharedMemory(create=True, size=capacity * 8)
+            prices = np.ndarray(capacity, dtype=np.float64, buffer=shm.buf)
+            if self.shm is not None:
+                self._retired.append(self.shm)
+            self.shm = shm
+        else:
+            prices = np.empty(capacity)
+        prices[:] = np.nan
+        if old is not None:
+            prices[:len(old)] = old
+        self.prices = prices
+
+    def attach(self, name):
+        # Shard side: map the parent's block; the parent owns and unlinks it
+        if self.shm is not None:
+            self.prices = None
+            self.shm.close()
+        self.shm = shared_memory.SharedMemory(name=name)
+        self.prices = np.ndarray(self.shm.size // 8, dtype=np.float64, buffer=self.shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name if self.shm else None
+
+    def extend(self, symbols):
+        for symbol in symbols:
+            self.index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+
+    def load(self, tickers):
+        # Parses this poll's mark prices; returns the symbols given new rows.
+        # An unparsable price is stored as 0 (listed, but no price).
+        new = []
+        rows, values = [], []
+        for symbol, data in tickers.items():
+            row = self.index.get(symbol)
+            if row is None:
+                if len(self.symbols) == len(self.prices):
+                    self._allocate(len(self.prices) * 2)
+                row = len(self.symbols)
+                self.extend((symbol,))
+                new.append(symbol)
+            try:
+                price = float(data.get("markPrice", 0))
+            except (TypeError, ValueError):
+                price = 0.0
+            rows.append(row)
+            values.append(price)
+        self.prices[:len(self.symbols)] = np.nan
+        self.prices[rows] = values
+        return new
+
+    def release_retired(self):
+        # Blocks replaced by a resize, once no shard maps them any more
+        for shm in self._retired:
+            shm.close()
+            shm.unlink()
+        self._retired = []
+
+    def close(self, unlink=False):
+        self.release_retired()
+        if self.shm is not None:
+            self.prices = None
+            self.shm.close()
+            if unlink:
+                self.shm.unlink()
+            self.shm = None
+
+
+class Quotes(Mapping):
+    # Read-only tickers view of a PriceTable: symbol -> {"markPrice": float}
+    # for the symbols in the latest poll. Entries are built on lookup, so a
+    # portfolio only pays for the symbols it asks about.
+    def __init__(self, table):
+        self.table = table
+
+    def get(self, symbol, default=None):
+        row = self.table.index.get(symbol)
+        if row is None:
+            return default
+        price = self.table.prices[row]
+        return default if price != price else {"markPrice": float(price)}
+
+    def __getitem__(self, symbol):
+        quote = self.get(symbol)
+        if quote is None:
+            raise KeyError(symbol)
+        return quote
+
+    def __contains__(self, symbol):
+        return self.get(symbol) is not None
+
+    def __iter__(self):
+        symbols, prices = self.table.symbols, self.table.prices
+        return (symbols[row] for row in np.flatnonzero(~np.isnan(prices[:len(symbols)])).tolist())
+
+    def __len__(self):
+        return int(np.count_nonzero(~np.isnan(self.table.prices[:len(self.table.symbols)])))
+
+
+def equity(portfolio, quotes):
+    # Cash plus the capital and gross PnL of every open position at mark
+    total = portfolio.cash
+    for symbol in portfolio.positions:
+        pos = portfolio.positions[symbol]
+        price = quotes.get(symbol, {}).get("markPrice") or pos.entry_price
+        entry = pos.entry_price
+        pnl_pct = (price - entry) / entry if pos.direction == Direction.LONG else (entry - price) / entry
+        total += pos.capital_used + pnl_pct * entry * pos.size
+    return total
+
+
+class VariantSet:
+    # A group of named portfolios stepped together on a shared clock, reading
+    # prices from `table`
+    def __init__(self, variants, table, portfolio_cls=Portfolio, base_settings=None):
+        self.clock = SimulatedClock()
+        self.portfolios = {
+            name: make_portfolio(overrides, self.clock, portfolio_cls, base_settings)
+            for name, overrides in variants.items()
+        }
+        self.table = table
+        self.quotes = Quotes(table)
+        self.started = False
+
+    def step(self, timestamp, signals):
+        self.clock.now = timestamp
+        quotes = self.quotes
+        for portfolio in self.portfolios.values():
+            if not self.started:
+                portfolio.session_start = timestamp
+            for symbol, signal in signals.items():
+                if symbol not in quotes:
+                    continue
+                portfolio.execute_trade(
+                    symbol=symbol,
+                    direction=signal["direction"],
+                    data=quotes[symbol],
+                    leverage=signal.get("leverage"),
+                    scalp=signal.get("scalp", False),
+                    simulate=True
+                )
+            portfolio.last_tickers = quotes
+            portfolio.update_positions(quotes)
+        self.started = True
+
+    def report(self):
+        return {
+            name: {
+                "equity": equity(portfolio, self.quotes),
+                "cash": portfolio.cash,
+                "open": len(portfolio.positions),
+                "trades": portfolio.stats.count,
+                "wins": portfolio.stats.wins,
+                "total_gain": portfolio.stats.total_gain,
+            }
+            for name, portfolio in self.portfolios.items()
+        }
+
+
+def _worker(conn, variants, portfolio_cls, base_settings, table_name):
+    table = PriceTable(name=table_name)
+    shard = VariantSet(variants, table, portfolio_cls, base_settings)
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        if message == "report":
+            conn.send(shard.report())
+        else:
+            timestamp, new_symbols, signals, name = message
+            if name != table.name:
+                table.attach(name)  # the parent grew the table
+            table.extend(new_symbols)
+            shard.step(timestamp, signals)
+            conn.send(None)
+    table.close()
+    conn.close()
+
+
+class MultiRunner:
+    # Fans each tick out to every variant. With workers > 1 the variants are
+    # split into that many shards, each living in its own process.
+
+    def __init__(self, variants, workers=1, portfolio_cls=Portfolio, threshold=None, limit=MAX_POSITIONS):
+        self.engine = SignalEngine(override_threshold=threshold)
+        self.limit = limit
+        self.ticks = 0
+        base_settings = load_settings()
+        workers = min(workers if workers > 0 else multiprocessing.cpu_count(), len(variants)) or 1
+        self.table = PriceTable(shared=workers > 1)
+        if workers == 1:
+            self.local = VariantSet(variants, self.table, portfolio_cls, base_settings)
+            self.conns, self.procs = [], []
+            return
+        self.local = None
+        names = list(variants)
+        shards = [{name: variants[name] for name in names[i::workers]} for i in range(workers)]
+        self.conns, self.procs = [], []
+        for shard in shards:
+            parent, child = multiprocessing.Pipe()
+            proc = multiprocessing.Process(target=_worker, args=(child, shard, portfolio_cls, base_settings, self.table.name),
+                                           daemon=True)
+            proc.start()
+            child.close()
+            self.conns.append(parent)
+            self.procs.append(proc)
+
+    def step(self, timestamp, tickers):
+        if not tickers:
+            return
+        signals = self.engine.update(tickers, limit=self.limit)
+        new_symbols = self.table.load(tickers)
+        if self.local:
+            self.local.step(timestamp, signals)
+        else:
+            message = (timestamp, new_symbols, signals, self.table.name)
+            for conn in self.conns:
+                conn.send(message)
+            for conn in self.conns:
+                conn.recv()
+            self.table.release_retired()
+        self.ticks += 1
+
+    def run(self, snapshots):
+        for timestamp, tickers in snapshots:
+            self.step(timestamp, tickers)
+        return self.report()
+
+    def report(self):
+        if self.local:
+            return self.local.report()
+        report = {}
+        for conn in self.conns:
+            conn.send("report")
+        for conn in self.conns:
+            report.update(conn.recv())
+        return report
+
+    def close(self):
+        for conn in self.conns:
+            conn.send(None)
+            conn.close()
+        for proc in self.procs:
+            proc.join()
+        self.conns, self.procs = [], []
+        self.table.close(unlink=self.table.shared)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def live_snapshots(api, interval=SLEEP_DELAY):
+    # One get_tickers call per tick, whatever the number of variants
+    while True:
+        tickers = api.get_tickers()
+        if tickers:
+            yield time.time(), tickers
+        time.sleep(interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many settings variants against one ticker stream")
+    parser.add_argument("variants", help='JSON file mapping variant name to settings overrides, e.g. {"tight": {"STOP_LOSS_PCT": 0.003}}')
+    parser.add_argument("snapshots", nargs="?", help="ticker tape (*.tape) or JSON-lines recording; polls the exchange if omitted")
+    parser.add_argument("--workers", type=int, default=1, help="processes to shard variants across (0 = all cores)")
+    parser.add_argument("--threshold", type=float, default=None, help="override MOMENTUM_THRESHOLD")
+    parser.add_argument("--vectorized", action="store_true", help="use the NumPy position engine")
+    parser.add_argument("--report-every", type=int, default=20, help="ticks between live equity reports")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    with open(args.variants) as f:
+        variants = json.load(f)
+
+    portfolio_cls = Portfolio
+    if args.vectorized:
+        from position_engine import VectorPortfolio
+        portfolio_cls = VectorPortfolio
+
+    if args.snapshots:
+        snapshots = open_snapshots(args.snapshots)
+    else:
+        from exchange import KrakenFuturesAPI
+        snapshots = live_snapshots(KrakenFuturesAPI())
+
+    with MultiRunner(variants, workers=args.workers, portfolio_cls=portfolio_cls, threshold=args.threshold) as runner:
+        try:
+            for timestamp, tickers in snapshots:
+                runner.step(timestamp, tickers)
+                if not args.snapshots and runner.ticks % args.report_every == 0:
+                    _print_report(runner.report())
+        except KeyboardInterrupt:
+            pass
+        print(f"Ticks: {runner.ticks}")
+        _print_report(runner.report())
+
+
+def _print_report(report):
+    print(f"{'VARIANT':<20} {'EQUITY':>12} {'CASH':>12} {'OPEN':>5} {'TRADES':>7} {'WIN%':>7} {'PNL':>10}")
+    for name, r in sorted(report.items(), key=lambda item: -item[1]["equity"]):
+        win_rate = r["wins"] / r["trades"] * 100 if r["trades"] else 0
+        print(f"{name:<20} {r['equity']:>12.2f} {r['cash']:>12.2f} {r['open']:>5} {r['trades']:>7} {win_rate:>6.2f}% {r['total_gain']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,67 @@
+import argparse
+import os
 
-import pandas as pd
-import matplotlib.pyplot as plt
+import numpy as np
+
+COLUMNS = ("Generation", "ROE_Fitness")
+THRESHOLD = "Momentum_Threshold"
+NOT_PARAMS = {"Generation", "Config#", "Ticks", "ROE_Fitness"}
+
+def load_results(path):
+    # (generation, fitness, params) from evolution_results.csv, or from a
+    # sweep.py results directory whose columns are memory-mapped one .npy
+    # file at a time. `params` maps every parameter column present, the
+    # threshold first, to its values; a sweep may not have a threshold.
+    if os.path.isdir(path):
+        from sweep import load_columns
+        names = sorted(name[:-4] for name in os.listdir(path) if name.endswith(".npy"))
+        params = sorted((name for name in names if name not in NOT_PARAMS), key=lambda name: name != THRESHOLD)
+        columns = load_columns(path, COLUMNS + tuple(params))
+    else:
+        import pandas as pd
+        df = pd.read_csv(path, usecols=lambda name: name in COLUMNS or name == THRESHOLD)
+        params = [THRESHOLD] if THRESHOLD in df.columns else []
+        columns = {name: df[name].to_numpy() for name in COLUMNS + tuple(params)}
+    generation, fitness = (np.asarray(columns[name]) for name in COLUMNS)
+    return generation, fitness, {name: np.asarray(columns[name]) for name in params}
+
+def _label(params, row):
+    # Annotation for one result row; a lone threshold keeps its short form
+    if list(params) == [THRESHOLD]:
+        return f"{params[THRESHOLD][row]:.1f}"
+    return ", ".join(f"{name}={values[row]:g}" for name, values in params.items() if not np.isnan(values[row]))
 
 def plot_evolution(csv_file="evolution_results.csv"):
-    df = pd.read_csv(csv_file)
+    import matplotlib.pyplot as plt
+
+    generation, fitness, params = load_results(csv_file)
     plt.figure(figsize=(10, 6))
 
     # Compute metrics
-    avg_roe = df.groupby("Generation")["ROE_Fitness"].mean()
-    max_roe = df.groupby("Generation")["ROE_Fitness"].max()
+    gens = np.unique(generation)
+    avg_roe = [fitness[generation == gen].mean() for gen in gens]
+    max_roe = [fitness[generation == gen].max() for gen in gens]
 
     # Plotting
     plt.plot(avg_roe, label="Avg ROE%", marker='o')
     plt.plot(max_roe, label="Max ROE%", linestyle='--', marker='x')
 
-    # Annotate best thresholds
-    for gen in df["Generation"].unique():
-        gen_data = df[df["Generation"] == gen]
-        best = gen_data.loc[gen_data["ROE_Fitness"].idxmax()]
-        plt.annotate(f'{best["Momentum_Threshold"]:.1f}', 
-                     (gen - 1, best["ROE_Fitness"]),
+    # Annotate the best parameters of each generation
+    for i, gen in enumerate(gens if params else ()):
+        rows = np.flatnonzero(generation == gen)
+        best = rows[np.argmax(fitness[rows])]
+        plt.annotate(_label(params, best),
+                     (i, fitness[best]),
                      textcoords="offset points",
                      xytext=(0, 6),
                      ha='center',
                      fontsize=8,
                      color='blue')
 
-    plt.title("Evolution of Strategy Fitness (ROE%) with Threshold Annotations")
+    if list(params) == [THRESHOLD]:
+        plt.title("Evolution of Strategy Fitness (ROE%) with Threshold Annotations")
+    else:
+        plt.title("Evolution of Strategy Fitness (ROE%) with Best-Parameter Annotations")
     plt.xlabel("Generation")
     plt.ylabel("ROE (Return on Equity %)")
     plt.legend()
@@ -35,5 +70,12 @@ def plot_evolution(csv_file="evolution_results.csv"):
     plt.savefig("evolution_plot.png")
     plt.show()
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plot fitness per generation with the best parameters annotated")
+    parser.add_argument("results", nargs="?", default="evolution_results.csv",
+                        help="evolution_results.csv or a sweep.py results directory")
+    args = parser.parse_args(argv)
+    plot_evolution(args.results)
+
 if __name__ == "__main__":
-    plot_evolution()
+    main()
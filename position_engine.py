@@ -0,0 +1,242 @@
+import time
+from collections.abc import MutableMapping
+
+import numpy as np
+
+from simulator import Portfolio
+from records import Direction, ExitReason, Position, Result, Trade
+from ticker_buffer import TickerBuffer
+
+DIRECTIONS = (Direction.LONG, Direction.SHORT)
+LONG, SHORT = 0, 1
+
+# Exit codes produced by evaluate_exits; 0 means the position stays open
+EXIT_REASONS = (None, ExitReason.STOP_LOSS, ExitReason.TAKE_PROFIT, ExitReason.TRAILING_STOP)
+STOP_LOSS, TAKE_PROFIT, TRAILING_STOP = 1, 2, 3
+
+FLOAT_FIELDS = (
+    "entry_price", "open_time", "size", "leverage", "hours_held", "capital_used",
+    "max_price", "min_price", "stop_loss_pct", "take_profit_pct", "trail_offset_pct",
+)
+BOOL_FIELDS = ("scalp", "breakeven_set", "trailing_active", "simulate")
+
+
+def evaluate_exits(price, direction, entry_price, leverage, hours_held, max_price, min_price,
+                   stop_loss_pct, take_profit_pct, trail_offset_pct, scalp, breakeven_set,
+                   trailing_active):
+    # Batched twin of the per-dict logic in Portfolio.update_positions. Works on
+    # arrays of any (matching) shape and updates the mutable state arrays in place.
+    # A take_profit_pct of NaN stands for None (removed once trailing kicks in).
+    # Rows whose price is NaN or 0 are skipped, exactly like a missing ticker.
+    live = ~np.isnan(price) & (price != 0)
+    long = direction == LONG
+    short = direction == SHORT
+
+    with np.errstate(invalid="ignore"):
+        pnl_pct = np.where(long, (price - entry_price) / entry_price, (entry_price - price) / entry_price)
+    roe_pct = pnl_pct * leverage
+    np.add(hours_held, 1/12, out=hours_held, where=live)
+
+    np.maximum(max_price, price, out=max_price, where=live & long)
+    np.minimum(min_price, price, out=min_price, where=live & ~long)
+
+    # Breakeven adjustment
+    breakeven = live & scalp & (pnl_pct > 0) & ~breakeven_set
+    stop_loss_pct[breakeven] = 0.0
+    breakeven_set |= breakeven
+    # Trailing activation at 2% ROE
+    activate = live & scalp & (roe_pct >= 0.02) & ~trailing_active
+    take_profit_pct[activate] = np.nan
+    stop_loss_pct[activate] = 0.0
+    trailing_active |= activate
+
+    exit_code = np.zeros(price.shape, dtype=np.int8)
+    trail_hit = (
+        (long & (price < max_price * (1 - trail_offset_pct)))
+        | (short & (price > min_price * (1 + trail_offset_pct)))
+    )
+    exit_code[live & trailing_active & trail_hit] = TRAILING_STOP
+
+    fixed = live & ~trailing_active
+    has_tp = ~np.isnan(take_profit_pct) & (take_profit_pct != 0)
+    exit_code[fixed & (pnl_pct <= -stop_loss_pct)] = STOP_LOSS
+    exit_code[fixed & has_tp & (pnl_pct >= take_profit_pct)] = TAKE_PROFIT
+    return live, pnl_pct, roe_pct, exit_code
+
+
+def net_pnl(pnl_pct, entry_price, size, hours_held, capital_used, fee_rate, funding_rate):
+    fee_cost = fee_rate * 2 * capital_used
+    funding = funding_rate * hours_held * entry_price * size
+    gross = pnl_pct * entry_price * size
+    return gross - fee_cost - funding
+
+
+class PositionBook(MutableMapping):
+    # Columnar store for open positions. Rows are packed at the front of each
+    # column; removing a position moves the last row into its slot.
+    # Reading a symbol returns a Position snapshot like the ones Portfolio stores,
+    # so the rest of Portfolio keeps working unchanged.
+
+    def __init__(self, capacity=64):
+        self.symbols = []
+        self.index = {}
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        n = len(self.symbols)
+        for name in FLOAT_FIELDS:
+            column = np.zeros(capacity, dtype=np.float64)
+            if n:
+                column[:n] = getattr(self, name)[:n]
+            setattr(self, name, column)
+        for name in BOOL_FIELDS:
+            column = np.zeros(capacity, dtype=bool)
+            if n:
+                column[:n] = getattr(self, name)[:n]
+            setattr(self, name, column)
+        direction = np.zeros(capacity, dtype=np.int8)
+        if n:
+            direction[:n] = self.direction[:n]
+        self.direction = direction
+        self.capacity = capacity
+
+    def columns(self):
+        n = len(self.symbols)
+        cols = {name: getattr(self, name)[:n] for name in FLOAT_FIELDS + BOOL_FIELDS}
+        cols["direction"] = self.direction[:n]
+        return cols
+
+    def gather_prices(self, tickers):
+        if isinstance(tickers, TickerBuffer):
+            return tickers.prices(self.symbols)
+        prices = np.full(len(self.symbols), np.nan)
+        for row, symbol in enumerate(self.symbols):
+            data = tickers.get(symbol)
+            if data:
+                prices[row] = float(data.get("markPrice", 0))
+        return prices
+
+    def remove_rows(self, rows):
+        for row in sorted(rows, reverse=True):
+            del self[self.symbols[row]]
+
+    def __setitem__(self, symbol, pos):
+        row = self.index.get(symbol)
+        if row is None:
+            row = len(self.symbols)
+            if row == self.capacity:
+                self._allocate(self.capacity * 2)
+            self.symbols.append(symbol)
+            self.index[symbol] = row
+        if pos.direction not in DIRECTIONS:
+            raise ValueError(f"Unknown direction: {pos.direction}")
+        self.direction[row] = DIRECTIONS.index(pos.direction)
+        for name in FLOAT_FIELDS:
+            value = getattr(pos, name)
+            getattr(self, name)[row] = np.nan if value is None else value
+        for name in BOOL_FIELDS:
+            getattr(self, name)[row] = bool(getattr(pos, name))
+
+    def __getitem__(self, symbol):
+        row = self.index[symbol]
+        fields = {name: float(getattr(self, name)[row]) for name in FLOAT_FIELDS}
+        fields.update({name: bool(getattr(self, name)[row]) for name in BOOL_FIELDS})
+        pos = Position(direction=DIRECTIONS[self.direction[row]], **fields)
+        if pos.leverage.is_integer():
+            pos.leverage = int(pos.leverage)
+        if np.isnan(pos.take_profit_pct):
+            pos.take_profit_pct = None
+        return pos
+
+    def __delitem__(self, symbol):
+        row = self.index.pop(symbol)
+        last = len(self.symbols) - 1
+        if row != last:
+            moved = self.symbols[last]
+            self.symbols[row] = moved
+            self.index[moved] = row
+            for name in FLOAT_FIELDS + BOOL_FIELDS + ("direction",):
+                column = getattr(self, name)
+                column[row] = column[last]
+        self.symbols.pop()
+
+    def __contains__(self, symbol):
+        return symbol in self.index
+
+    def __iter__(self):
+        return iter(list(self.symbols))
+
+    def __len__(self):
+        return len(self.symbols)
+
+
+class VectorPortfolio(Portfolio):
+    # Drop-in Portfolio whose update_positions evaluates every open position in
+    # one batched pass over a PositionBook instead of looping over dicts.
+
+    def __init__(self, initial_cash, max_open_positions=10, clock=time.time, metrics=None, journal=None, events=None,
+                 execution=None):
+        super().__init__(initial_cash, max_open_positions, clock, metrics, journal, events, execution)
+        self.positions = PositionBook(capacity=max(16, max_open_positions))
+
+    def update_positions(self, tickers):
+        book = self.positions
+        prices = book.gather_prices(tickers)
+        cols = book.columns()
+        live, pnl_pct, roe_pct, exit_code = evaluate_exits(
+            prices, cols["direction"], cols["entry_price"], cols["leverage"], cols["hours_held"],
+            cols["max_price"], cols["min_price"], cols["stop_loss_pct"], cols["take_profit_pct"],
+            cols["trail_offset_pct"], cols["scalp"], cols["breakeven_set"], cols["trailing_active"],
+        )
+        net = net_pnl(
+            pnl_pct, cols["entry_price"], cols["size"], cols["hours_held"], cols["capital_used"],
+            self.settings.get("TRADING_FEE", 0.0006), self.settings.get("FUNDING_RATE_ESTIMATE", 0.0002),
+        )
+
+        closed = np.flatnonzero(exit_code).tolist()
+        closed.sort(key=lambda row: book.symbols[row])
+        for row in closed:
+            symbol = book.symbols[row]
+            price = float(prices[row])
+            capital_used = float(cols["capital_used"][row])
+            net_pnl_row = float(net[row])
+            roe = float(roe_pct[row])
+            if self.execution:
+                # Re-priced at the book VWAP; the batch above used the mark
+                pos = book[symbol]
+                price = self._exit_price(symbol, pos, price)
+                entry = pos.entry_price
+                pnl = (price - entry) / entry if pos.direction == Direction.LONG else (entry - price) / entry
+                net_pnl_row = float(net_pnl(
+                    pnl, entry, pos.size, pos.hours_held, capital_used,
+                    self.settings.get("TRADING_FEE", 0.0006), self.settings.get("FUNDING_RATE_ESTIMATE", 0.0002),
+                ))
+                roe = pnl * pos.leverage
+            self.cash += capital_used + net_pnl_row
+            result = Result.PROFIT if net_pnl_row > 0 else Result.LOSS
+            self._flash("Closed %s @ %.4f: %+.2f$ (%s)", symbol, price, net_pnl_row, result)
+            self._record_trade(Trade(
+                symbol=symbol,
+                entry_price=float(cols["entry_price"][row]),
+                exit_price=price,
+                capital_used=capital_used,
+                gain=net_pnl_row,
+                roe=roe,
+                result=result,
+                exit_reason=EXIT_REASONS[exit_code[row]],
+                scalp=bool(cols["scalp"][row])
+            ))
+
+        if self.dashboard:
+            open_rows = np.flatnonzero(live & (exit_code == 0)).tolist()
+            open_rows.sort(key=lambda row: book.symbols[row])
+            open_lines = [
+                (book.symbols[row], book[book.symbols[row]], float(roe_pct[row]),
+                 float(pnl_pct[row]), float(net[row]), float(prices[row]))
+                for row in open_rows
+            ]
+        book.remove_rows(closed)
+        self.metrics.incr("exits", len(closed))
+
+        if self.dashboard:
+            self.dashboard.publish(self.snapshot(open_lines))
@@ -0,0 +1,64 @@
+from dataclasses import dataclass
+from enum import StrEnum
+
+# Slotted records for open positions and closed trades. The enums are str
+# subclasses, so they compare equal to (and format as) the plain strings used
+# before: Direction.LONG == "long", f"{Result.PROFIT}" == "profit".
+
+
+class Direction(StrEnum):
+    LONG = "long"
+    SHORT = "short"
+
+
+class Result(StrEnum):
+    PROFIT = "profit"
+    LOSS = "loss"
+
+
+class ExitReason(StrEnum):
+    STOP_LOSS = "STOP LOSS"
+    TAKE_PROFIT = "TAKE PROFIT"
+    TRAILING_STOP = "TRAILING STOP"
+    FORCED_EXIT = "FORCED EXIT"
+
+
+@dataclass(slots=True)
+class Position:
+    entry_price: float
+    open_time: float
+    size: float
+    direction: Direction
+    leverage: float
+    hours_held: float
+    capital_used: float
+    max_price: float
+    min_price: float
+    stop_loss_pct: float
+    take_profit_pct: float  # None once trailing takes over
+    trail_offset_pct: float
+    scalp: bool
+    breakeven_set: bool = False
+    trailing_active: bool = False
+    simulate: bool = True
+
+
+@dataclass(slots=True)
+class Trade:
+    symbol: str
+    entry_price: float
+    exit_price: float
+    capital_used: float
+    gain: float
+    roe: float
+    result: Result
+    exit_reason: ExitReason
+    scalp: bool
+
+    def row(self):
+        # CSV row in FIELDS order
+        return (self.symbol, self.entry_price, self.exit_price, self.capital_used, self.gain,
+                self.roe, self.result, self.exit_reason, self.scalp)
+
+
+FIELDS = ["symbol", "entry_price", "exit_price", "capital_used", "gain", "roe", "result", "exit_reason", "scalp"]
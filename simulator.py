@@ -1,14 +1,30 @@
 import logging
-import csv
-import curses
+import math
 import time
 import json
+from collections import namedtuple
 from pathlib import Path
 
-# Configure logging
-logging.basicConfig(filename='simulation.log', level=logging.INFO,
-                    format='%(asctime)s - %(message)s')
+from journal import TradeStats
+from records import Direction, ExitReason, Position, Result, Trade
+from metrics import Metrics
+
 SETTINGS_PATH = "settings.json"
+LOG_PATH = "simulation.log"
+
+PositionRow = namedtuple("PositionRow", [
+    "symbol", "direction", "leverage", "roe", "pnl", "net", "stop_loss_pct", "take_profit_pct",
+    "trail_offset_pct", "trailing_active", "scalp", "capital_used", "open_time",
+])
+PortfolioSnapshot = namedtuple("PortfolioSnapshot", [
+    "time", "session_start", "cash", "closed", "wins", "flash_message", "flash_time", "rows",
+])
+
+def configure_logging(path=LOG_PATH):
+    # Called by entry points; importing this module never touches the log file.
+    # Records are queued and written to a size-rotated file on a listener thread
+    from eventlog import start_logging
+    start_logging(path)
 
 def load_settings():
     try:
@@ -18,30 +34,67 @@ def load_settings():
         return {}
 
 class Portfolio:
-    def __init__(self, initial_cash, max_open_positions=10):
+    def __init__(self, initial_cash, max_open_positions=10, clock=time.time, metrics=None, journal=None, events=None,
+                 execution=None):
         self.cash = initial_cash
         self.positions = {}
-        self.trade_history = []
-        self.screen = None
+        self.stats = TradeStats()
+        self.journal = journal
+        self.events = events  # eventlog.EventLog for entry/exit events, None = no trade logging
+        self.execution = execution  # execution.FillModel walking orderbooks, None = fill at markPrice
         self.default_leverage = 20
         self.max_open_positions = max_open_positions
         self.cooldowns = {}
         self.cooldown_seconds = 300
         self.flash_message = ""
-        self.flash_timer = 0
+        self.flash_time = None
+        self.dashboard = None
         self.settings = load_settings()
-        self.session_start = time.time()
+        self.clock = clock
+        self.session_start = clock()
         self.last_tickers = {}
+        self.metrics = metrics or Metrics()
+
+    def _record_trade(self, trade):
+        self.stats.add(trade)
+        if self.journal:
+            self.journal.append(trade)
+        if self.events:
+            self.events.emit("exit", {
+                "symbol": trade.symbol, "entry_price": trade.entry_price, "price": trade.exit_price,
+                "capital_used": trade.capital_used, "gain": trade.gain, "roe": trade.roe,
+                "result": trade.result, "reason": trade.exit_reason, "scalp": trade.scalp,
+            }, self.clock())
+
+    def _exit_price(self, symbol, pos, price):
+        # Price a close of `pos` gets: the mark, or the book VWAP for its whole size
+        if not self.execution or not price > 0 or not math.isfinite(price):
+            return price
+        side = "sell" if pos.direction == Direction.LONG else "buy"
+        return self.execution.fill(symbol, side, pos.size, price, self.clock(), partial=False).price
+
+    def _flash(self, message, *args):
+        # %-style args are only formatted when a dashboard will show them
+        if args and self.dashboard is None:
+            return
+        self.flash_message = message % args if args else message
+        self.flash_time = self.clock()
 
     def execute_trade(self, symbol, direction, data, leverage=None, scalp=False, simulate=True):
-        now = time.time()
+        now = self.clock()
         if len(self.positions) >= self.max_open_positions:
+            self.metrics.reject("max_positions")
             return
         if symbol in self.cooldowns and now - self.cooldowns[symbol] < self.cooldown_seconds:
+            self.metrics.reject("cooldown")
             return
 
         price = float(data.get("markPrice", 0))
-        if not price or symbol in self.positions:
+        if not price or not math.isfinite(price):
+            self.metrics.reject("no_price")
+            return
+        if symbol in self.positions:
+            self.metrics.reject("already_open")
             return
 
         leverage = leverage or self.default_leverage
@@ -51,8 +104,18 @@ class Portfolio:
             cap_pct = 0.05
         trade_cash = self.cash * cap_pct
         size = trade_cash / price
+        if self.execution:
+            fill = self.execution.fill(symbol, "buy" if direction == Direction.LONG else "sell", size, price, now)
+            if not fill.size:
+                self.metrics.reject("no_liquidity")
+                return
+            if fill.size < size:
+                self.metrics.incr("partial_fills")
+            price, size = fill.price, fill.size
+            trade_cash = price * size
         cost = trade_cash * (1 + self.settings.get("TRADING_FEE", 0.0006))
         if self.cash < cost:
+            self.metrics.reject("insufficient_cash")
             return
 
         if scalp:
@@ -64,28 +127,31 @@ class Portfolio:
         ts_pct = self.settings.get("TRAIL_STOP_PCT", 0.003)
 
         self.cash -= cost
-        self.positions[symbol] = {
-            "entry_price": price,
-            "open_time": now,
-            "size": size,
-            "direction": direction,
-            "leverage": leverage,
-            "hours_held": 0,
-            "capital_used": cost,
-            "max_price": price,
-            "min_price": price,
-            "stop_loss_pct": sl_pct,
-            "take_profit_pct": tp_pct,
-            "trail_offset_pct": ts_pct,
-            "scalp": scalp,
-            "breakeven_set": False,
-            "trailing_active": False,
-            "simulate": simulate
-        }
+        self.positions[symbol] = Position(
+            entry_price=price,
+            open_time=now,
+            size=size,
+            direction=Direction(direction),
+            leverage=leverage,
+            hours_held=0,
+            capital_used=cost,
+            max_price=price,
+            min_price=price,
+            stop_loss_pct=sl_pct,
+            take_profit_pct=tp_pct,
+            trail_offset_pct=ts_pct,
+            scalp=scalp,
+            simulate=simulate
+        )
 
-        self.flash_message = f"Opened {symbol} {direction.upper()} @ {price:.4f}"
-        self.flash_timer = 3
-        logging.info(f"[SIM] Entered {direction} {symbol} @ {price:.4f} | Lev:{leverage}x SL:{sl_pct:.4f} TP:{tp_pct:.4f} TS:{ts_pct:.4f}")
+        self.metrics.incr("entries")
+        self._flash("Opened %s %s @ %.4f", symbol, direction.upper(), price)
+        if self.events:
+            self.events.emit("entry", {
+                "symbol": symbol, "direction": direction, "price": price, "size": size, "leverage": leverage,
+                "capital_used": cost, "stop_loss_pct": sl_pct, "take_profit_pct": tp_pct,
+                "trail_offset_pct": ts_pct, "scalp": scalp,
+            }, now)
 
     def update_positions(self, tickers):
         to_close = []
@@ -97,220 +163,147 @@ class Portfolio:
             if not data:
                 continue
             price = float(data.get("markPrice", 0))
-            if not price:
+            if not price or not math.isfinite(price):
                 continue
 
-            direction = pos["direction"]
-            entry = pos["entry_price"]
-            pnl_pct = (price - entry) / entry if direction == "long" else (entry - price) / entry
-            roe_pct = pnl_pct * pos["leverage"]
-            pos["hours_held"] += 1/12
+            direction = pos.direction
+            entry = pos.entry_price
+            pnl_pct = (price - entry) / entry if direction == Direction.LONG else (entry - price) / entry
+            roe_pct = pnl_pct * pos.leverage
+            pos.hours_held += 1/12
 
-            if direction == "long":
-                pos["max_price"] = max(pos["max_price"], price)
+            if direction == Direction.LONG:
+                pos.max_price = max(pos.max_price, price)
             else:
-                pos["min_price"] = min(pos["min_price"], price)
+                pos.min_price = min(pos.min_price, price)
 
             # Breakeven adjustment
-            if pos["scalp"] and pnl_pct > 0 and not pos["breakeven_set"]:
-                pos["stop_loss_pct"] = 0.0
-                pos["breakeven_set"] = True
+            if pos.scalp and pnl_pct > 0 and not pos.breakeven_set:
+                pos.stop_loss_pct = 0.0
+                pos.breakeven_set = True
             # Trailing activation at 2% ROE
-            if pos["scalp"] and roe_pct >= 0.02 and not pos["trailing_active"]:
-                pos["take_profit_pct"] = None
-                pos["stop_loss_pct"] = 0.0
-                pos["trailing_active"] = True
+            if pos.scalp and roe_pct >= 0.02 and not pos.trailing_active:
+                pos.take_profit_pct = None
+                pos.stop_loss_pct = 0.0
+                pos.trailing_active = True
 
             exit_reason = None
-            if pos["trailing_active"]:
-                if direction == "long" and price < pos["max_price"] * (1 - pos["trail_offset_pct"]):
-                    exit_reason = "TRAILING STOP"
-                if direction == "short" and price > pos["min_price"] * (1 + pos["trail_offset_pct"]):
-                    exit_reason = "TRAILING STOP"
+            if pos.trailing_active:
+                if direction == Direction.LONG and price < pos.max_price * (1 - pos.trail_offset_pct):
+                    exit_reason = ExitReason.TRAILING_STOP
+                if direction == Direction.SHORT and price > pos.min_price * (1 + pos.trail_offset_pct):
+                    exit_reason = ExitReason.TRAILING_STOP
             else:
-                if pnl_pct <= -pos["stop_loss_pct"]:
-                    exit_reason = "STOP LOSS"
-                if pos["take_profit_pct"] and pnl_pct >= pos["take_profit_pct"]:
-                    exit_reason = "TAKE PROFIT"
+                if pnl_pct <= -pos.stop_loss_pct:
+                    exit_reason = ExitReason.STOP_LOSS
+                if pos.take_profit_pct and pnl_pct >= pos.take_profit_pct:
+                    exit_reason = ExitReason.TAKE_PROFIT
 
             if exit_reason:
-                capital_used = pos["capital_used"]
+                if self.execution:
+                    price = self._exit_price(symbol, pos, price)
+                    pnl_pct = (price - entry) / entry if direction == Direction.LONG else (entry - price) / entry
+                    roe_pct = pnl_pct * pos.leverage
+                capital_used = pos.capital_used
                 fee_cost = self.settings.get("TRADING_FEE", 0.0006) * 2 * capital_used
-                funding   = self.settings.get("FUNDING_RATE_ESTIMATE", 0.0002) * pos["hours_held"] * entry * pos["size"]
-                gross     = pnl_pct * entry * pos["size"]
+                funding   = self.settings.get("FUNDING_RATE_ESTIMATE", 0.0002) * pos.hours_held * entry * pos.size
+                gross     = pnl_pct * entry * pos.size
                 net_pnl   = gross - fee_cost - funding
                 self.cash += capital_used + net_pnl
-                result = "profit" if net_pnl > 0 else "loss"
-                self.flash_message = f"Closed {symbol} @ {price:.4f}: {net_pnl:+.2f}$ ({result})"
-                self.flash_timer = 3
-                logging.info(f"[SIM] Closed {symbol} @ {price:.4f} | {result.upper()} {net_pnl:.2f} USD | ROE:{roe_pct*100:.2f}%")
-                self.trade_history.append({
-                    "symbol": symbol,
-                    "entry_price": entry,
-                    "exit_price": price,
-                    "capital_used": capital_used,
-                    "gain": net_pnl,
-                    "roe": roe_pct,
-                    "result": result,
-                    "exit_reason": exit_reason,
-                    "scalp": pos["scalp"]
-                })
+                result = Result.PROFIT if net_pnl > 0 else Result.LOSS
+                self._flash("Closed %s @ %.4f: %+.2f$ (%s)", symbol, price, net_pnl, result)
+                self._record_trade(Trade(
+                    symbol=symbol,
+                    entry_price=entry,
+                    exit_price=price,
+                    capital_used=capital_used,
+                    gain=net_pnl,
+                    roe=roe_pct,
+                    result=result,
+                    exit_reason=exit_reason,
+                    scalp=pos.scalp
+                ))
                 to_close.append(symbol)
             else:
-                fee_cost = self.settings.get("TRADING_FEE", 0.0006) * 2 * pos["capital_used"]
-                funding   = self.settings.get("FUNDING_RATE_ESTIMATE", 0.0002) * pos["hours_held"] * entry * pos["size"]
-                gross     = pnl_pct * entry * pos["size"]
+                fee_cost = self.settings.get("TRADING_FEE", 0.0006) * 2 * pos.capital_used
+                funding   = self.settings.get("FUNDING_RATE_ESTIMATE", 0.0002) * pos.hours_held * entry * pos.size
+                gross     = pnl_pct * entry * pos.size
                 net_pnl   = gross - fee_cost - funding
                 open_lines.append((symbol, pos, roe_pct, pnl_pct, net_pnl, price))
 
         for s in to_close:
             del self.positions[s]
+        self.metrics.incr("exits", len(to_close))
 
-        if self.screen:
-            # Session and PnL summary
-            elapsed = time.time() - self.session_start
-            hrs, rem  = divmod(int(elapsed), 3600)
-            mins, secs = divmod(rem, 60)
-            scalp_net = sum(l[4] for l in open_lines if l[1]["scalp"])
-            swing_net = sum(l[4] for l in open_lines if not l[1]["scalp"])
-            total_closed = len(self.trade_history)
-            wins = sum(1 for t in self.trade_history if t["result"] == "profit")
-            win_rate = (wins/total_closed*100) if total_closed else 0
-            total_allocated = sum(l[1]["capital_used"] for l in open_lines)
-            total_net = sum(l[4] for l in open_lines)
+        if self.dashboard:
+            self.dashboard.publish(self.snapshot(open_lines))
 
-            self.screen.erase()
-            rows, cols = self.screen.getmaxyx()
-            self.screen.addstr(0, 0,
-                f"Time {hrs:02d}:{mins:02d}:{secs:02d}  Cash:${self.cash:.2f}  Closed:{total_closed}  Win:{win_rate:5.2f}%")
-            self.screen.addstr(1, 0,
-                f"Alloc:${total_allocated:.2f}  OpenPnL:${total_net:.2f} (Scalp:${scalp_net:.2f} Swing:${swing_net:.2f})")
-
-            if self.flash_timer > 0:
-                clr = curses.color_pair(2 if "+" in self.flash_message else 1)
-                self.screen.addstr(2, 0, self.flash_message, clr)
-                self.flash_timer -= 1
-
-            # column headers
-            header = (
-                f"{'SYMBOL':<14} {'DIR':<8} {'LEV':>5}  "
-                f"{'ROE%':>7}  {'PnL%':>7}  {'Net$':>9}  "
-                f"{'SL%':>6}  {'TP%':>6}  {'TS%':>6}  {'TYPE':>6}  {'DUR':>8}"
-            )
-            self.screen.addstr(3, 0, header, curses.color_pair(3))
-
-            for idx, (symbol, pos, roe, pnl, net, price) in enumerate(open_lines[:rows-5]):
-                sl_pct = pos["stop_loss_pct"] * 100
-                tp_pct = (pos["take_profit_pct"] or 0) * 100
-                ts_pct = pos["trail_offset_pct"] * 100
-                                # display slash when SL removed or TS not active
-                sl_disp = f"{sl_pct:>6.2f}%" if pos["stop_loss_pct"] != 0 else f"{'/':>7}"
-                ts_disp = f"{ts_pct:>6.2f}%" if pos["trailing_active"] else f"{'/':>7}"
-
-                trade_type = 'SCALP' if pos['scalp'] else 'SWING'
-                # duration
-                dur = time.time() - pos["open_time"]
-                dh, dr = divmod(int(dur), 3600)
-                dm, ds = divmod(dr, 60)
-                dur_str = f"{dh:02d}:{dm:02d}:{ds:02d}"
-
-                clr = curses.color_pair(2 if net > 0 else 1 if net < 0 else 3)
-                line = (
-                    f"{symbol:<14} {pos['direction']:<8} {pos['leverage']:>5}  "
-                    f"{roe*100:>7.2f}%  {pnl*100:>7.2f}%  ${net:>7.2f}  "
-                    f"{sl_disp}  {tp_pct:>6.2f}%  {ts_disp}  "
-                    f"{trade_type:>6}  {dur_str:>8}"
+    def snapshot(self, open_lines):
+        # Immutable view of the portfolio for the render thread
+        return PortfolioSnapshot(
+            time=self.clock(),
+            session_start=self.session_start,
+            cash=self.cash,
+            closed=self.stats.count,
+            wins=self.stats.wins,
+            flash_message=self.flash_message,
+            flash_time=self.flash_time,
+            rows=tuple(
+                PositionRow(
+                    symbol, pos.direction, pos.leverage, roe, pnl, net,
+                    pos.stop_loss_pct, pos.take_profit_pct, pos.trail_offset_pct,
+                    pos.trailing_active, pos.scalp, pos.capital_used, pos.open_time,
                 )
-                self.screen.addstr(4 + idx, 0, line, clr)
-
-            self.screen.refresh()
-            time.sleep(self.settings.get("SLEEP_DELAY", 1))
+                for symbol, pos, roe, pnl, net, price in open_lines
+            ),
+        )
 
-    def _show_session_summary(self):
-        # Force-close all open positions
+    def close_all_positions(self):
+        # Force-close all open positions at the last known price
         for symbol, pos in list(self.positions.items()):
             data  = self.last_tickers.get(symbol, {})
-            price = float(data.get("markPrice", pos["entry_price"]))
-            entry = pos["entry_price"]
-            pnl_pct = (price-entry)/entry if pos["direction"]=="long" else (entry-price)/entry
-            fee     = self.settings.get("TRADING_FEE",0.0006)*2*pos["capital_used"]
-            funding = self.settings.get("FUNDING_RATE_ESTIMATE",0.0002)*pos["hours_held"]*entry*pos["size"]
-            gross   = pnl_pct*entry*pos["size"]
+            price = self._exit_price(symbol, pos, float(data.get("markPrice", pos.entry_price)))
+            entry = pos.entry_price
+            pnl_pct = (price-entry)/entry if pos.direction == Direction.LONG else (entry-price)/entry
+            fee     = self.settings.get("TRADING_FEE",0.0006)*2*pos.capital_used
+            funding = self.settings.get("FUNDING_RATE_ESTIMATE",0.0002)*pos.hours_held*entry*pos.size
+            gross   = pnl_pct*entry*pos.size
             net     = gross-fee-funding
-            self.cash += pos["capital_used"]+net
-            result = "profit" if net>0 else "loss"
-            self.trade_history.append({
-                "symbol": symbol,
-                "entry_price": entry,
-                "exit_price": price,
-                "capital_used": pos["capital_used"],
-                "gain": net,
-                "roe": pnl_pct*pos["leverage"],
-                "result": result,
-                "exit_reason": "FORCED EXIT",
-                "scalp": pos["scalp"]
-            })
+            self.cash += pos.capital_used+net
+            result = Result.PROFIT if net>0 else Result.LOSS
+            self._record_trade(Trade(
+                symbol=symbol,
+                entry_price=entry,
+                exit_price=price,
+                capital_used=pos.capital_used,
+                gain=net,
+                roe=pnl_pct*pos.leverage,
+                result=result,
+                exit_reason=ExitReason.FORCED_EXIT,
+                scalp=pos.scalp
+            ))
             del self.positions[symbol]
 
-        total = len(self.trade_history)
-        wins  = sum(1 for t in self.trade_history if t["result"]=="profit")
-        total_pnl = sum(t["gain"] for t in self.trade_history)
-        avg_roe   = sum(t["roe"] for t in self.trade_history)/total if total else 0
-
-        self.screen.erase()
-        summary_lines = [
+    def session_summary(self):
+        stats = self.stats
+        return [
             "=== SESSION SUMMARY ===",
-            f"Trades: {total}  Wins: {wins}  WinRate: {wins/total*100 if total else 0:.2f}%",
-            f"Total PnL: ${total_pnl:.2f}  Final Cash: ${self.cash:.2f}",
-            f"Avg ROE: {avg_roe*100:.2f}%",
-            "Press 'q' again to exit"
+            f"Trades: {stats.count}  Wins: {stats.wins}  WinRate: {stats.win_rate*100:.2f}%",
+            f"Total PnL: ${stats.total_gain:.2f}  Final Cash: ${self.cash:.2f}",
+            f"Avg ROE: {stats.avg_roe*100:.2f}%",
         ]
-        for i, text in enumerate(summary_lines):
-            self.screen.addstr(i+2, 2, text, curses.color_pair(3))
-        self.screen.refresh()
 
     def run_with_ui(self, tickers_generator):
-        curses.wrapper(self._run_loop, tickers_generator)
-
-    def _run_loop(self, stdscr, tickers_generator):
-        self.screen = stdscr
-        curses.start_color()
-        curses.init_pair(1, curses.COLOR_RED, curses.COLOR_BLACK)
-        curses.init_pair(2, curses.COLOR_GREEN, curses.COLOR_BLACK)
-        curses.init_pair(3, curses.COLOR_YELLOW, curses.COLOR_BLACK)
-        stdscr.nodelay(True)
-        try:
-            curses.curs_set(0)
-        except:
-            pass
-        while True:
-            c = stdscr.getch()
-            if c == ord('q'):
-                self._show_session_summary()
-                while True:
-                    d = stdscr.getch()
-                    if d == ord('q'):
-                        return
-            if c == ord('r'):
-                self.settings = load_settings()
-                self.flash_message = "[Reloaded settings.json]"
-                self.flash_timer   = 3
-            try:
-                tickers = next(tickers_generator)
-                self.last_tickers = tickers or {}
-                self.update_positions(tickers or {})
-            except StopIteration:
-                break
-            except Exception as e:
-                import traceback
-                logging.error("UI loop error: " + traceback.format_exc())
-                break
+        from dashboard import Dashboard
+        return Dashboard(self).run(tickers_generator)
 
-    def summary_report(self):
-        with open("trade_summary.csv", "w", newline="") as csvfile:
-            fieldnames = ["symbol","entry_price","exit_price","capital_used","gain","roe","result","exit_reason","scalp"]
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            for trade in self.trade_history:
-                writer.writerow(trade)
+    def summary_report(self, close=True):
+        # close=False leaves the journal and event log open for a trading
+        # thread that may still be running; buffered trades are still written
+        if self.journal and close:
+            self.journal.close()
+        elif self.journal:
+            self.journal.flush()
+        if self.events and close:
+            self.events.close()
         logging.info(f"Remaining Cash: ${self.cash:.2f}")
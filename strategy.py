@@ -1,6 +1,11 @@
+import bisect
+import numpy as np
+from ticker_buffer import TickerBuffer
 from config import MOMENTUM_THRESHOLD, MIN_VOLUME, FUNDING_RATE_SHORT, FUNDING_RATE_LONG
 
-def detect_signals(tickers, limit=None, override_threshold=None):
+def detect_signals(tickers, limit=None, override_threshold=None, allow=None):
+    # allow(symbol, direction), e.g. FeatureStore.gate(), vetoes candidates
+    # before the limit is applied
     threshold = override_threshold if override_threshold is not None else MOMENTUM_THRESHOLD
     candidates = []
 
@@ -28,6 +33,8 @@ def detect_signals(tickers, limit=None, override_threshold=None):
             continue
 
     candidates.sort(key=lambda x: -x[2])
+    if allow:
+        candidates = [c for c in candidates if allow(c[0], c[1])]
     if limit:
         candidates = candidates[:limit]
 
@@ -38,4 +45,118 @@ def detect_signals(tickers, limit=None, override_threshold=None):
             "scalp": scalp
         }
         for symbol, direction, _, scalp in candidates
-    }
\ No newline at end of file
+    }
+
+def detect_signals_buffer(buffer, limit=None, override_threshold=None, allow=None):
+    # detect_signals over a TickerBuffer, scored column-wise; ties keep
+    # response order like detect_signals' stable sort
+    threshold = override_threshold if override_threshold is not None else MOMENTUM_THRESHOLD
+    rows = buffer.rows()
+    change = buffer.columns["change24h"][rows]
+    funding = buffer.columns["fundingRate"][rows]
+    tradable = buffer.valid[rows] & ~(buffer.columns["volumeQuote"][rows] < MIN_VOLUME)
+    long = tradable & (change > 0) & (funding < FUNDING_RATE_LONG)
+    short = tradable & (change < 0) & (funding > FUNDING_RATE_SHORT)
+    picked = np.flatnonzero(long | short)
+    momentum = np.abs(change[picked])
+    ranked = picked[np.argsort(-momentum, kind="stable")]
+    symbols = buffer.symbols
+    if allow:
+        ranked = np.array([i for i in ranked.tolist() if allow(symbols[rows[i]], "long" if long[i] else "short")],
+                          dtype=np.intp)
+    if limit:
+        ranked = ranked[:limit]
+
+    return {
+        symbols[rows[i]]: {
+            "direction": "long" if long[i] else "short",
+            "leverage": 50 if scalp else 10,
+            "scalp": scalp
+        }
+        for i, scalp in zip(ranked.tolist(), (np.abs(change[ranked]) >= threshold).tolist())
+    }
+
+class SignalEngine:
+    # Incremental detect_signals: keeps the last raw ticker fields per symbol,
+    # re-scores only symbols whose fields changed, and keeps candidates ranked
+    # in a sorted list. update() returns exactly what detect_signals would for
+    # the same tickers; equal-momentum ties are ordered by position in the
+    # tickers dict, as detect_signals' stable sort does.
+
+    def __init__(self, override_threshold=None):
+        self.threshold = override_threshold if override_threshold is not None else MOMENTUM_THRESHOLD
+        self._state = {}   # symbol -> (raw fields, ranked entry or None)
+        self._ranked = []  # (-abs(change), symbol, direction, scalp)
+        self.rescored = 0
+
+    def _score(self, symbol, raw):
+        try:
+            change, volume, funding = (float(value) for value in raw)
+        except:
+            return None
+        if volume < MIN_VOLUME:
+            return None
+        if change > 0 and funding < FUNDING_RATE_LONG:
+            direction = "long"
+        elif change < 0 and funding > FUNDING_RATE_SHORT:
+            direction = "short"
+        else:
+            return None
+        return (-abs(change), symbol, direction, abs(change) >= self.threshold)
+
+    def _unrank(self, entry):
+        del self._ranked[bisect.bisect_left(self._ranked, entry)]
+
+    def update(self, tickers, limit=None, allow=None):
+        if isinstance(tickers, TickerBuffer):
+            # The buffer is already typed; a full column-wise pass is cheaper
+            # than diffing it row by row
+            return detect_signals_buffer(tickers, limit, self.threshold, allow)
+        state = self._state
+        for symbol, data in tickers.items():
+            try:
+                raw = (data.get("change24h", 0), data.get("volumeQuote", 0), data.get("fundingRate", 0))
+            except:
+                raw = None
+            prev = state.get(symbol)
+            if prev:
+                if prev[0] == raw:
+                    continue
+                if prev[1]:
+                    self._unrank(prev[1])
+            entry = self._score(symbol, raw)
+            if entry:
+                bisect.insort(self._ranked, entry)
+            state[symbol] = (raw, entry)
+            self.rescored += 1
+
+        if len(state) > len(tickers):
+            for symbol in [s for s in state if s not in tickers]:
+                entry = state.pop(symbol)[1]
+                if entry:
+                    self._unrank(entry)
+
+        return self._signals(tickers, limit, allow)
+
+    def _signals(self, tickers, limit, allow=None):
+        ranked = self._ranked
+        if allow:
+            ranked = [entry for entry in ranked if allow(entry[1], entry[2])]
+        end = len(ranked)
+        if limit and limit < end:
+            # Take every entry tied with the last one that makes the cut
+            end = bisect.bisect_right(ranked, (ranked[limit - 1][0], "\U0010ffff"))
+        top = ranked[:end]
+        if any(a[0] == b[0] for a, b in zip(top, top[1:])):
+            order = {symbol: i for i, symbol in enumerate(tickers)}
+            top.sort(key=lambda entry: (entry[0], order[entry[1]]))
+        if limit:
+            top = top[:limit]
+        return {
+            symbol: {
+                "direction": direction,
+                "leverage": 50 if scalp else 10,
+                "scalp": scalp
+            }
+            for _, symbol, direction, scalp in top
+        }
@@ -0,0 +1,137 @@
+import argparse
+import asyncio
+import random
+
+from aiohttp import web
+
+# Local stand-in for the Kraken Futures public API, for exercising the
+# exchange clients without network access. Every /tickers request serves the
+# next recorded snapshot; orderbooks and funding history are synthesized
+# around the current mark price. Latency and error rate can be injected to
+# test timeouts and retries. The /ws endpoint streams a Kraken-style ticker
+# feed that interpolates mark prices between consecutive snapshots, as a
+# high-frequency price stream for event_sim.
+
+API_PREFIX = "/derivatives/api/v3"
+
+
+class StubExchange:
+    def __init__(self, snapshots, latency=0.0, error_rate=0.0, depth=10, seed=0, stream_steps=10, stream_interval=0.05):
+        self.snapshots = list(snapshots)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.depth = depth
+        self.rng = random.Random(seed)
+        self.position = 0
+        self.requests = 0
+        self.tickers = self.snapshots[0][1] if self.snapshots else {}
+        self.stream_steps = stream_steps
+        self.stream_interval = stream_interval
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get(f"{API_PREFIX}/tickers", self.handle_tickers)
+        app.router.add_get(f"{API_PREFIX}/orderbook", self.handle_orderbook)
+        app.router.add_get(f"{API_PREFIX}/historicalfundingrates", self.handle_funding)
+        app.router.add_get("/ws", self.handle_ws)
+        return app
+
+    async def _delay(self):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            raise web.HTTPServiceUnavailable()
+
+    async def handle_tickers(self, request):
+        await self._delay()
+        if self.snapshots:
+            self.tickers = self.snapshots[self.position % len(self.snapshots)][1]
+            self.position += 1
+        return web.json_response({"result": "success", "tickers": list(self.tickers.values())})
+
+    def orderbook(self, symbol):
+        data = self.tickers.get(symbol)
+        if not data:
+            return {"bids": [], "asks": []}
+        mid = float(data.get("markPrice", 0))
+        tick = mid * 0.0001
+        bids = [[mid - tick * (i + 1), round(self.rng.uniform(0.5, 5.0) * (i + 1), 4)] for i in range(self.depth)]
+        asks = [[mid + tick * (i + 1), round(self.rng.uniform(0.5, 5.0) * (i + 1), 4)] for i in range(self.depth)]
+        return {"bids": bids, "asks": asks}
+
+    async def handle_orderbook(self, request):
+        await self._delay()
+        symbol = request.query.get("symbol", "")
+        return web.json_response({"result": "success", "orderBook": self.orderbook(symbol)})
+
+    async def handle_funding(self, request):
+        await self._delay()
+        data = self.tickers.get(request.query.get("symbol", ""), {})
+        rate = float(data.get("fundingRate", 0))
+        return web.json_response({"result": "success", "rates": [{"fundingRate": rate, "relativeFundingRate": rate}]})
+
+    def price_updates(self, symbols=None):
+        # (timestamp, symbol, price) linearly interpolated between snapshots,
+        # stream_steps updates per symbol per snapshot interval
+        for (t0, before), (t1, after) in zip(self.snapshots, self.snapshots[1:]):
+            for step in range(self.stream_steps):
+                frac = step / self.stream_steps
+                batch = []
+                for symbol, data in after.items():
+                    if (symbols and symbol not in symbols) or symbol not in before:
+                        continue
+                    try:
+                        p0, p1 = float(before[symbol].get("markPrice", 0)), float(data.get("markPrice", 0))
+                    except (TypeError, ValueError):
+                        continue
+                    if p0 and p1:
+                        batch.append((symbol, p0 + (p1 - p0) * frac))
+                yield t0 + (t1 - t0) * frac, batch
+
+    async def handle_ws(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        subscribe = await ws.receive_json()
+        symbols = set(subscribe.get("product_ids") or ())
+        for timestamp, batch in self.price_updates(symbols):
+            if ws.closed:
+                break
+            for symbol, price in batch:
+                await ws.send_json({"feed": "ticker", "product_id": symbol, "markPrice": price, "time": int(timestamp * 1000)})
+            await asyncio.sleep(self.stream_interval)
+        await ws.close()
+        return ws
+
+
+async def start_stub(stub, host="127.0.0.1", port=0):
+    # Starts the stub in the running loop; returns (runner, base_url)
+    runner = web.AppRunner(stub.app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://{host}:{port}{API_PREFIX}"
+
+
+def main():
+    from backtest import open_snapshots
+
+    parser = argparse.ArgumentParser(description="Serve recorded tickers as a local Kraken Futures API")
+    parser.add_argument("snapshots", help="ticker tape (*.tape) or JSON-lines recording")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--stream-steps", type=int, default=10, help="/ws price updates per symbol between snapshots")
+    parser.add_argument("--stream-interval", type=float, default=0.05, help="seconds between /ws update batches")
+    args = parser.parse_args()
+
+    stub = StubExchange(open_snapshots(args.snapshots), latency=args.latency, error_rate=args.error_rate,
+                        stream_steps=args.stream_steps, stream_interval=args.stream_interval)
+    print(f"Serving {len(stub.snapshots)} snapshots at http://{args.host}:{args.port}{API_PREFIX} (price feed at ws://{args.host}:{args.port}/ws)")
+    web.run_app(stub.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from backtest import run_backtest, open_snapshots
+from fitness_cache import FitnessCache, dataset_fingerprint, settings_fingerprint
+from multiplex import make_portfolio
+from simulator import configure_logging
+
+# Multi-parameter search over the momentum threshold and Portfolio risk
+# settings on recorded data. A configuration maps "momentum_threshold" and any
+# settings.json key (or DEFAULT_LEVERAGE / MAX_POSITIONS, see multiplex) to a
+# value; its fitness is the same total gain / total capital ROE that
+# genetic_evolution.evaluate_strategy uses.
+#
+# Modes: "grid" scores every combination, "random" samples each parameter
+# uniformly between the smallest and largest listed value, and "halving"
+# (successive halving) scores grid or random candidates on a short prefix of
+# the recording, keeps the best 1/eta and multiplies the prefix by eta until
+# the survivors run on the whole recording.
+#
+# Results are written as one .npy file per column in a directory, so
+# plot_evolution.py (and anything else) can memory-map just the columns it
+# needs. "Generation" holds the halving rung.
+
+# Signal parameters; every other name is a settings.json override
+STRATEGY_PARAMS = ("momentum_threshold", "min_trend", "max_volatility")
+
+DEFAULT_SPACE = {
+    "momentum_threshold": [5.0, 7.0, 9.0, 11.0],
+    "STOP_LOSS_PCT": [0.003, 0.005, 0.008],
+    "TAKE_PROFIT_PCT": [0.012, 0.018, 0.025],
+    "TRAIL_STOP_PCT": [0.002, 0.003, 0.005],
+    "NORMAL_TRADE_CAPITAL_PCT": [0.1, 0.2, 0.4],
+}
+
+
+def grid(space):
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def sample(space, n, rng):
+    configs = []
+    for _ in range(n):
+        config = {}
+        for name, values in space.items():
+            low, high = min(values), max(values)
+            if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+                config[name] = rng.randint(low, high)
+            else:
+                config[name] = rng.uniform(low, high)
+        configs.append(config)
+    return configs
+
+
+def evaluate_config(config, snapshots, ticks=None):
+    overrides = {name: value for name, value in config.items() if name not in STRATEGY_PARAMS}
+    portfolio = make_portfolio(overrides, clock=time.time)
+    run_backtest(snapshots[:ticks], threshold=config.get("momentum_threshold"), portfolio=portfolio,
+                 min_trend=config.get("min_trend"), max_volatility=config.get("max_volatility"))
+    stats = portfolio.stats
+    return (stats.total_gain / stats.total_capital) if stats.total_capital > 0 else 0
+
+
+# Recording of a pool worker, loaded once by _init_worker
+_worker_snapshots = None
+
+def _init_worker(snapshots_path):
+    global _worker_snapshots
+    _worker_snapshots = list(open_snapshots(snapshots_path))
+
+def _evaluate(task):
+    config, ticks = task
+    return evaluate_config(config, _worker_snapshots, ticks)
+
+
+class ColumnWriter:
+    # Accumulates result rows and rewrites <directory>/<column>.npy on flush
+    def __init__(self, directory):
+        self.directory = directory
+        self.columns = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, row):
+        for name in row:
+            self.columns.setdefault(name, [math.nan] * self._rows())
+        for name, values in self.columns.items():
+            values.append(row.get(name, math.nan))
+
+    def _rows(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def flush(self):
+        for name, values in self.columns.items():
+            np.save(os.path.join(self.directory, f"{name}.npy"), np.asarray(values, dtype=np.float64))
+
+
+def load_columns(directory, names):
+    # Memory-mapped read of the named columns written by ColumnWriter
+    return {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in names}
+
+
+class Sweep:
+    def __init__(self, snapshots_path, workers=1, cache_path=None, out="sweep_results"):
+        self.snapshots_path = snapshots_path
+        self.snapshots = list(open_snapshots(snapshots_path))
+        self.cache = FitnessCache(
+            dataset_fingerprint(path=snapshots_path), settings_fingerprint(search="sweep"), path=cache_path
+        )
+        self.workers = workers if workers > 0 else os.cpu_count()
+        self.pool = None
+        if self.workers != 1:
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(snapshots_path,),
+            )
+        self.writer = ColumnWriter(out)
+
+    def close(self):
+        if self.pool:
+            self.pool.shutdown()
+        self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def evaluate(self, configs, ticks, generation):
+        # Scores configs on the first `ticks` snapshots (all when None)
+        params = [(ticks,) + tuple(sorted(config.items())) for config in configs]
+        results = [self.cache.get(p) for p in params]
+        pending = [i for i, r in enumerate(results) if r is None]
+        tasks = [(configs[i], ticks) for i in pending]
+        if self.pool:
+            chunksize = max(1, len(tasks) // (self.workers * 4))
+            scored = list(self.pool.map(_evaluate, tasks, chunksize=chunksize))
+        else:
+            scored = [evaluate_config(config, self.snapshots, ticks) for config, ticks in tasks]
+        for i, fitness in zip(pending, scored):
+            results[i] = fitness
+            self.cache.put(params[i], fitness)
+        self.cache.commit()
+
+        for i, (config, fitness) in enumerate(zip(configs, results)):
+            row = {"Generation": generation, "Config#": i + 1, "Ticks": ticks or len(self.snapshots)}
+            row.update({_column(name): value for name, value in config.items()})
+            row["ROE_Fitness"] = fitness
+            self.writer.append(row)
+        self.writer.flush()
+        return results
+
+    def run(self, configs):
+        results = self.evaluate(configs, None, 1)
+        return sorted(zip(results, configs), key=lambda item: -item[0])
+
+    def halving(self, configs, eta=3, min_ticks=10):
+        total = len(self.snapshots)
+        # floor(log_eta(len(configs))) in integers; math.log rounds exact powers down
+        rungs = 0
+        while eta ** (rungs + 1) <= len(configs):
+            rungs += 1
+        generation = 1
+        for rung in range(rungs + 1):
+            ticks = max(min_ticks, total // eta ** (rungs - rung))
+            full = ticks >= total or rung == rungs
+            results = self.evaluate(configs, None if full else ticks, generation)
+            ranked = sorted(zip(results, range(len(configs))), key=lambda item: -item[0])
+            if full:
+                return [(fitness, configs[i]) for fitness, i in ranked]
+            keep = max(1, len(configs) // eta)
+            configs = [configs[i] for _, i in ranked[:keep]]
+            generation += 1
+        return []
+
+
+def _column(name):
+    # Same spelling genetic_evolution uses for the threshold column
+    return "Momentum_Threshold" if name == "momentum_threshold" else name
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grid / random / successive-halving search over strategy settings")
+    parser.add_argument("snapshots", help="ticker tape (*.tape) or JSON-lines recording")
+    parser.add_argument("--space", help="JSON file mapping parameter name to candidate values (default: built-in space)")
+    parser.add_argument("--mode", choices=("grid", "random", "halving"), default="grid")
+    parser.add_argument("--samples", type=int, default=None, help="random configurations (random mode; halving uses the grid if omitted)")
+    parser.add_argument("--eta", type=int, default=3, help="halving: keep 1/eta of the configurations per rung")
+    parser.add_argument("--min-ticks", type=int, default=10, help="halving: shortest prefix to score on")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes, 0 = all cores")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--cache", default=None, help="SQLite file that keeps scored configurations across runs")
+    parser.add_argument("--out", default="sweep_results", help="directory for the columnar results")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    space = DEFAULT_SPACE
+    if args.space:
+        with open(args.space) as f:
+            space = json.load(f)
+    rng = random.Random(args.seed)
+    if args.mode == "random" or (args.mode == "halving" and args.samples):
+        configs = sample(space, args.samples or 50, rng)
+    else:
+        configs = grid(space)
+
+    with Sweep(args.snapshots, workers=args.workers, cache_path=args.cache, out=args.out) as sweep:
+        if args.mode == "halving":
+            ranked = sweep.halving(configs, eta=args.eta, min_ticks=args.min_ticks)
+        else:
+            ranked = sweep.run(configs)
+        print(f"Scored {len(configs)} configurations ({sweep.cache.hits} cached)")
+    for fitness, config in ranked[:5]:
+        print(f"ROE {fitness:+.4f}  {json.dumps(config)}")
+    print(f"Results written to {args.out}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+
+# Ticker tape: an append-only binary file with one record per poll.
+#
+#   file   := MAGIC record*
+#   record := header new_symbols pad ids pad markPrice change24h volumeQuote fundingRate
+#   header := timestamp f8, rows u4, new_symbol_bytes u4
+#
+# New symbols are appended to the tape's symbol dictionary in the record where
+# they first appear ("\n"-joined UTF-8), so ids stay stable for the whole tape.
+# Columns are little-endian and 8-byte aligned, so a reader can hand out NumPy
+# views straight into the memory map. Missing fields are stored as 0.0 (the
+# default detect_signals uses) and unparseable ones as NaN.
+
+MAGIC = b"TKTAPE01"
+HEADER = struct.Struct("<dII")
+FIELDS = ("markPrice", "change24h", "volumeQuote", "fundingRate")
+
+
+def _pad(n):
+    return -n % 8
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class TapeWriter:
+    def __init__(self, path, flush_every=1):
+        self.path = path
+        self.flush_every = flush_every
+        self.symbol_ids = {}
+        self._pending = 0
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with TapeReader(path) as reader:
+                reader.scan()
+                self.symbol_ids = {symbol: i for i, symbol in enumerate(reader.symbols)}
+                end = reader.end
+            # Drop a partially written trailing record before appending
+            with open(path, "r+b") as f:
+                f.truncate(end)
+            self.file = open(path, "ab")
+        else:
+            self.file = open(path, "wb")
+            self.file.write(MAGIC)
+
+    def append(self, tickers, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        n = len(tickers)
+        ids = np.empty(n, dtype="<i4")
+        columns = np.empty((len(FIELDS), n), dtype="<f8")
+        new_symbols = []
+        for row, (symbol, data) in enumerate(tickers.items()):
+            sid = self.symbol_ids.get(symbol)
+            if sid is None:
+                sid = self.symbol_ids[symbol] = len(self.symbol_ids)
+                new_symbols.append(symbol)
+            ids[row] = sid
+            for col, field in enumerate(FIELDS):
+                columns[col, row] = _to_float(data.get(field, 0))
+
+        names = "\n".join(new_symbols).encode("utf-8")
+        ids_bytes = ids.tobytes()
+        parts = [
+            HEADER.pack(timestamp, n, len(names)),
+            names, b"\0" * _pad(HEADER.size + len(names)),
+            ids_bytes, b"\0" * _pad(len(ids_bytes)),
+            columns.tobytes(),
+        ]
+        self.file.write(b"".join(parts))
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self.file.flush()
+        self._pending = 0
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TickView:
+    # One poll's worth of columns; the arrays are views into the reader's mmap
+    # and are only valid while the reader stays open.
+    __slots__ = ("timestamp", "ids", "columns", "symbols")
+
+    def __init__(self, timestamp, ids, columns, symbols):
+        self.timestamp = timestamp
+        self.ids = ids
+        self.columns = columns
+        self.symbols = symbols
+
+    def __len__(self):
+        return len(self.ids)
+
+    def column(self, field):
+        return self.columns[FIELDS.index(field)]
+
+    def as_tickers(self):
+        # Rebuilds the get_tickers() shape for code that still expects dicts
+        symbols = self.symbols
+        rows = self.columns.T.tolist()
+        tickers = {}
+        for sid, values in zip(self.ids.tolist(), rows):
+            symbol = symbols[sid]
+            data = {"symbol": symbol}
+            for field, value in zip(FIELDS, values):
+                data[field] = None if value != value else value
+            tickers[symbol] = data
+        return tickers
+
+
+class TapeReader:
+    def __init__(self, path):
+        self.path = path
+        self.symbols = []
+        self.end = len(MAGIC)
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        if size and self._mm[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a ticker tape")
+
+    def __iter__(self):
+        mm = self._mm
+        if mm is None:
+            return
+        size = len(mm)
+        offset = len(MAGIC)
+        self.symbols.clear()
+        while offset + HEADER.size <= size:
+            timestamp, n, name_len = HEADER.unpack_from(mm, offset)
+            names_at = offset + HEADER.size
+            ids_at = names_at + name_len + _pad(HEADER.size + name_len)
+            cols_at = ids_at + 4 * n + _pad(4 * n)
+            record_end = cols_at + 8 * n * len(FIELDS)
+            if record_end > size:
+                break  # truncated trailing record
+            if name_len:
+                self.symbols.extend(mm[names_at:names_at + name_len].decode("utf-8").split("\n"))
+            ids = np.frombuffer(mm, dtype="<i4", count=n, offset=ids_at)
+            columns = np.frombuffer(mm, dtype="<f8", count=n * len(FIELDS), offset=cols_at).reshape(len(FIELDS), n)
+            offset = self.end = record_end
+            yield TickView(timestamp, ids, columns, self.symbols)
+
+    def scan(self):
+        # Walks every record (loading the symbol dictionary) and returns the tick count
+        return sum(1 for _ in self)
+
+    def snapshots(self):
+        # (timestamp, tickers) pairs, the format backtest.run_backtest consumes
+        for tick in self:
+            yield tick.timestamp, tick.as_tickers()
+
+    def close(self):
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                # NumPy views handed out by the iterator still reference the map;
+                # it is released once they are garbage collected.
+                pass
+            self._mm = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
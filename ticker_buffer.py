@@ -0,0 +1,205 @@
+import json
+from collections.abc import Mapping
+
+import numpy as np
+
+# Reusable typed buffer for ticker polls. The /tickers response is decoded
+# with a json object hook that pulls out only the fields the bot uses and
+# drops each ticker object as soon as it is read; the values are converted to
+# float64 a column at a time into a preallocated structured array, so nothing
+# downstream calls float() on them again. Each symbol
+# keeps the row it got when first seen for the lifetime of the buffer; rows
+# of symbols missing from the latest poll are flagged absent.
+#
+# The buffer is a read-only Mapping of symbol -> TickerRow in response order,
+# and a TickerRow answers .get(field, default) like a ticker dict, so
+# Portfolio, SignalEngine and the recorders accept it in place of the dict
+# get_tickers() returns. strategy.detect_signals_buffer reads the columns
+# directly.
+
+FIELDS = ("markPrice", "change24h", "volumeQuote", "fundingRate")
+DTYPE = np.dtype([(field, "f8") for field in FIELDS] + [("present", "?"), ("valid", "?")])
+
+
+def _parse(values):
+    parsed = np.zeros(len(values))
+    ok = np.ones(len(values), dtype=bool)
+    for i, value in enumerate(values):
+        try:
+            parsed[i] = float(value)
+        except (TypeError, ValueError):
+            ok[i] = False
+    return parsed, ok
+
+
+class TickerRow(Mapping):
+    # Dict-like view of one symbol's row; created once per symbol and reused
+    __slots__ = ("_buffer", "_row", "symbol")
+
+    def __init__(self, buffer, row, symbol):
+        self._buffer = buffer
+        self._row = row
+        self.symbol = symbol
+
+    def __getitem__(self, field):
+        if field == "symbol":
+            return self.symbol
+        column = self._buffer.columns.get(field)
+        if column is None:
+            raise KeyError(field)
+        return float(column[self._row])
+
+    def get(self, field, default=None):
+        column = self._buffer.columns.get(field)
+        if column is not None:
+            return float(column[self._row])
+        return self.symbol if field == "symbol" else default
+
+    def __iter__(self):
+        return iter(("symbol",) + FIELDS)
+
+    def __len__(self):
+        return len(FIELDS) + 1
+
+
+class TickerBuffer(Mapping):
+    def __init__(self, capacity=512):
+        self.index = {}     # symbol -> row, stable across polls
+        self.symbols = []   # row -> symbol
+        self.order = []     # rows of the latest poll, in response order
+        self._views = []    # row -> TickerRow
+        self._allocate(capacity)
+        self.begin()
+
+    def _allocate(self, capacity):
+        data = np.zeros(capacity, dtype=DTYPE)
+        if hasattr(self, "data"):
+            data[:len(self.data)] = self.data
+        self.data = data
+        self.columns = {field: data[field] for field in FIELDS}
+        self.present = data["present"]
+        self.valid = data["valid"]
+
+    def _row(self, symbol):
+        row = len(self.symbols)
+        if row == len(self.data):
+            self._allocate(row * 2)
+        self.index[symbol] = row
+        self.symbols.append(symbol)
+        self._views.append(TickerRow(self, row, symbol))
+        return row
+
+    def begin(self):
+        # Starts a new poll: every row is absent until stored again
+        self.present[:len(self.symbols)] = False
+        self.order = []
+        self._raw = tuple([] for _ in FIELDS)
+
+    def _add(self, symbol, get):
+        row = self.index.get(symbol)
+        if row is None:
+            row = self._row(symbol)
+        self.order.append(row)
+        mark, change, volume, funding = self._raw
+        mark.append(get("markPrice", 0))
+        change.append(get("change24h", 0))
+        volume.append(get("volumeQuote", 0))
+        funding.append(get("fundingRate", 0))
+
+    def _hook(self, obj):
+        symbol = obj.get("symbol")
+        if symbol is None:
+            return obj
+        self._add(symbol, obj.get)
+
+    def _commit(self):
+        # Converts the raw field values of the poll column by column
+        if len(set(self.order)) != len(self.order):
+            # Duplicate symbol: first position, last values, like a dict
+            # built from the response
+            last = {row: i for i, row in enumerate(self.order)}
+            picked = [last[row] for row in dict.fromkeys(self.order)]
+            self.order = [self.order[i] for i in picked]
+            self._raw = tuple([values[i] for i in picked] for values in self._raw)
+        rows = self.rows()
+        self.present[rows] = True
+        self.valid[rows] = True
+        for values, field in zip(self._raw, FIELDS):
+            column = self.columns[field]
+            try:
+                column[rows] = np.array(values, dtype="f8")
+            except (TypeError, ValueError):
+                # Non-numeric strings or other garbage somewhere in the column
+                column[rows], ok = _parse(values)
+                if field != "markPrice":
+                    self.valid[rows] &= ok
+            # JSON nulls convert to NaN without raising. detect_signals skips
+            # tickers whose fields do not parse, while a bad price just reads
+            # as no price
+            finite = np.isfinite(column[rows])
+            if field == "markPrice":
+                column[rows[~finite]] = 0.0
+            else:
+                self.valid[rows] &= finite
+        self._raw = tuple([] for _ in FIELDS)
+
+    def load_json(self, payload):
+        # Parses a /tickers response body (bytes or str) into the buffer;
+        # ticker objects are folded into the columns as they are decoded
+        self.begin()
+        data = json.loads(payload, object_hook=self._hook)
+        self._commit()
+        return data
+
+    def load_tickers(self, tickers):
+        # Fills the buffer from a get_tickers()-style dict
+        self.begin()
+        for symbol, data in tickers.items():
+            self._add(symbol, data.get)
+        self._commit()
+        return self
+
+    def rows(self):
+        # Rows of the latest poll as an array, in response order
+        return np.fromiter(self.order, dtype=np.intp, count=len(self.order))
+
+    def prices(self, symbols):
+        # markPrice per symbol as an array, NaN where the symbol is absent
+        index, present = self.index, self.present
+        rows = np.fromiter((index.get(symbol, -1) for symbol in symbols), dtype=np.intp, count=len(symbols))
+        prices = np.full(len(symbols), np.nan)
+        found = rows >= 0
+        found[found] = present[rows[found]]
+        prices[found] = self.columns["markPrice"][rows[found]]
+        return prices
+
+    def __getitem__(self, symbol):
+        row = self.index.get(symbol)
+        if row is None or not self.present[row]:
+            raise KeyError(symbol)
+        return self._views[row]
+
+    def __contains__(self, symbol):
+        row = self.index.get(symbol)
+        return row is not None and bool(self.present[row])
+
+    def get(self, symbol, default=None):
+        row = self.index.get(symbol)
+        if row is None or not self.present[row]:
+            return default
+        return self._views[row]
+
+    def __iter__(self):
+        symbols = self.symbols
+        return (symbols[row] for row in self.order)
+
+    def items(self):
+        symbols, views = self.symbols, self._views
+        return [(symbols[row], views[row]) for row in self.order]
+
+    def __len__(self):
+        return len(self.order)
+
+    def as_tickers(self):
+        # Plain dicts, for code that needs to serialize a poll
+        return {symbol: dict(view) for symbol, view in self.items()}